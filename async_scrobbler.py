@@ -0,0 +1,144 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from mixcd_scrobbler import LastFMScrobbler, MAX_SCROBBLES_PER_REQUEST
+
+class AsyncLastFMScrobbler:
+    """asyncio engine for scrobbling several CDs or batches at once
+
+    HTTP calls run on the scrobbler's pooled keep-alive session through a
+    small worker pool, so the event loop never blocks and at most
+    max_concurrency requests are in flight at a time. requests is the only
+    HTTP client shipped in the Android build, which is why this does not
+    use a separate async client.
+    """
+    def __init__(self, scrobbler=None, max_concurrency=4):
+        self.scrobbler = scrobbler or LastFMScrobbler(pool_size=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.semaphore = None
+        self.loop = None
+        self.loop_thread = None
+
+    def get_semaphore(self):
+        """Get the concurrency limit, created inside the running loop"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on the worker pool"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def report_progress(self, on_progress, *args):
+        """Call a progress callback, awaiting it if it is a coroutine function"""
+        if on_progress is None:
+            return
+        result = on_progress(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    async def submit_chunk(self, chunk, run_id=None):
+        """Submit one track.scrobble batch once a concurrency slot is free"""
+        async with self.get_semaphore():
+            return await self.run_blocking(self.scrobbler.submit_and_report, chunk, run_id)
+
+    async def scrobble_batch(self, scrobbles, on_progress=None, run_id=None):
+        """Scrobble many tracks, sending their 50-track batches concurrently
+
+        on_progress(done, total) is called after each batch completes.
+        Returns one outcome per item, in order.
+        """
+        chunks = [scrobbles[i:i + MAX_SCROBBLES_PER_REQUEST]
+                  for i in range(0, len(scrobbles), MAX_SCROBBLES_PER_REQUEST)]
+        done = 0
+
+        async def send(chunk):
+            nonlocal done
+            outcomes = await self.submit_chunk(chunk, run_id)
+            done += len(chunk)
+            await self.report_progress(on_progress, done, len(scrobbles))
+            return outcomes
+
+        results = await asyncio.gather(*(send(chunk) for chunk in chunks))
+        return [outcome for chunk_outcomes in results for outcome in chunk_outcomes]
+
+    async def scrobble_mix_cd(self, tracklist, start_time=None, avg_track_length=4, track_range=None, on_progress=None,
+                              allow_duplicates=False, end_time=None):
+        """Scrobble an entire mix CD or selected tracks without blocking the loop
+
+        Emits the same progress events, and skips the same already-scrobbled
+        tracks, as LastFMScrobbler.scrobble_mix_cd.
+        Returns the run's stats, or None if authentication failed.
+        """
+        if not await self.run_blocking(self.scrobbler.ensure_authenticated, True):
+            print("✗ Authentication failed. Cannot scrobble.")
+            return None
+
+        if start_time is None and end_time is None:
+            start_time = datetime.now()
+        began = time.monotonic()
+
+        durations = await self.run_blocking(
+            self.scrobbler.lookup_durations, self.scrobbler.selected_tracks(tracklist, track_range)[0]
+        )
+        scrobbles, track_offset, end_time = self.scrobbler.plan_scrobbles(
+            tracklist, start_time, avg_track_length, track_range, durations, end_time
+        )
+        if start_time is None:
+            start_time = scrobbles[0]['timestamp'] if scrobbles else end_time
+        scrobbles, duplicates = await self.run_blocking(self.scrobbler.skip_duplicates, scrobbles, allow_duplicates)
+        run_id = self.scrobbler.start_run(tracklist, scrobbles, start_time, avg_track_length, track_range)
+        self.scrobbler.report_duplicates(run_id, duplicates)
+        spool_ids = await self.run_blocking(self.scrobbler.spool_scrobbles, scrobbles)
+
+        outcomes = await self.scrobble_batch(scrobbles, on_progress, run_id)
+
+        await self.run_blocking(self.scrobbler.acknowledge_spooled, spool_ids, outcomes)
+        return self.scrobbler.finish_run(run_id, scrobbles, outcomes, end_time, began, duplicates)
+
+    async def scrobble_many(self, jobs, on_progress=None):
+        """Scrobble several CDs concurrently
+
+        Each job is a dict of scrobble_mix_cd keyword arguments (tracklist,
+        start_time, track_range, ...). on_progress(job_index, done, total) is
+        called as each job's batches complete. Returns the stats per job.
+        """
+        async def run_job(index, job):
+            async def job_progress(done, total):
+                await self.report_progress(on_progress, index, done, total)
+            return await self.scrobble_mix_cd(on_progress=job_progress, **job)
+
+        return await asyncio.gather(*(run_job(i, job) for i, job in enumerate(jobs)))
+
+    def start(self):
+        """Run the engine's event loop on a single background thread"""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the background loop from any thread
+
+        Returns a concurrent.futures.Future for its result.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        """Stop the background loop and worker pool, then close the scrobbler"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join(timeout=5)
+            self.loop.close()
+            self.loop = None
+            self.loop_thread = None
+        self.executor.shutdown(wait=False)
+        self.scrobbler.close()
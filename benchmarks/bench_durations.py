@@ -0,0 +1,75 @@
+"""Track-duration lookups against the local Last.fm stand-in, cold and warm
+
+Run from the repository root:
+
+    python -m benchmarks.bench_durations
+    python -m benchmarks.bench_durations --tracks 500 --latency 0.05
+
+Scrobbles the same mix twice through scrobble_mix_cd with a fresh
+duration cache. The first run has to ask track.getInfo about every
+distinct track; the second should make no track.getInfo calls at all and
+space its timestamps by the same real durations. Everything is written to
+a temporary directory.
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from mixcd_scrobbler import LastFMScrobbler, RateLimiter
+
+from benchmarks.harness import make_tracklist, timed, quiet, print_table
+from benchmarks.lastfm_standin import LastFMStandIn
+from benchmarks.run_benchmarks import authenticate
+
+def scrobble_once(standin, tracklist, start_time, args, workdir, run):
+    """Scrobble tracklist with a new scrobbler sharing the duration cache; return a result row"""
+    scrobbler = LastFMScrobbler(
+        spool_file=os.path.join(workdir, f"spool_{run}.db"),
+        # A separate history per run, so the second run is not skipped as a duplicate
+        history_file=os.path.join(workdir, f"history_{run}.db"),
+        durations_file=os.path.join(workdir, "durations.db"),
+        rate_limiter=RateLimiter(rate=args.client_rate, burst=args.client_rate),
+        api_url=standin.url
+    )
+    scrobbler.unsubscribe(scrobbler.console_reporter)
+    try:
+        with quiet():
+            authenticate(scrobbler, standin)
+            standin.reset_stats()
+            stats, seconds = timed(scrobbler.scrobble_mix_cd, tracklist, start_time)
+        cached = scrobbler.durations.count()
+    finally:
+        scrobbler.close()
+
+    calls = standin.stats()['calls']
+    return [run, calls.get('track.getInfo', 0), calls.get('track.scrobble', 0), cached,
+            f"{seconds:.3f}", stats['accepted'] if stats else 0, stats['end_time'] - start_time if stats else "-"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure track.getInfo calls with a cold and a warm duration cache")
+    parser.add_argument('--tracks', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01, help="stand-in seconds per call (default 0.01)")
+    parser.add_argument('--client-rate', type=float, default=1000,
+                        help="scrobbler RateLimiter calls per second (the app uses 5)")
+    args = parser.parse_args(argv)
+
+    tracklist = make_tracklist(args.tracks)
+    distinct = len({(track['artist'].casefold(), track['track'].casefold()) for track in tracklist})
+    expected = sum(LastFMStandIn().track_duration(track['artist'], track['track']) or 240 for track in tracklist)
+    start_time = datetime.now() - timedelta(seconds=expected)
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="mixcd-bench-") as workdir, LastFMStandIn(latency=args.latency) as standin:
+        # The scrobbler reads and writes lastfm_credentials.json in the working directory
+        os.chdir(workdir)
+        try:
+            rows = [scrobble_once(standin, tracklist, start_time, args, workdir, run) for run in ("cold", "warm")]
+        finally:
+            os.chdir(original_dir)
+
+    print_table(f"Duration lookups, {args.tracks} tracks ({distinct} distinct)",
+                ["run", "getInfo calls", "scrobble calls", "cached", "seconds", "accepted", "listening time"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Memory used per track by the CD library, before and after Track records
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --tracks 250000
+
+"before" is the library as json.load returns it (a dict per track).
+"after" is the same library held by CDCollection as MixCD/Track records.
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from mixcd_storage import CDCollection, Track
+
+from benchmarks.harness import make_library, print_table
+
+def retained_bytes(build):
+    """Bytes still allocated once build() has returned and garbage is collected"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def distinct_strings(cds):
+    """Number of distinct string objects used for artists and albums"""
+    ids = set()
+    for cd_info in cds.values():
+        for track in cd_info['tracks']:
+            ids.add(id(track['artist']))
+            ids.add(id(track.get('album')))
+    return len(ids)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-track memory of the CD library")
+    parser.add_argument('--tracks', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    # Serialize first so both sides start from the same JSON text, as at startup
+    text = json.dumps(make_library(args.tracks), indent=2)
+
+    plain, plain_bytes = retained_bytes(lambda: json.loads(text))
+    plain_strings = distinct_strings(plain)
+    del plain
+
+    records, records_bytes = retained_bytes(lambda: CDCollection(json.loads(text)))
+    records_strings = distinct_strings(records)
+    del records
+
+    sample = {"artist": "The Replacements", "track": "Left of the Dial", "album": "Tim"}
+    rows = [
+        ["dicts (before)", f"{plain_bytes / 1024 / 1024:.1f}", f"{plain_bytes / args.tracks:.0f}",
+         sys.getsizeof(sample), plain_strings],
+        ["Track records (after)", f"{records_bytes / 1024 / 1024:.1f}", f"{records_bytes / args.tracks:.0f}",
+         sys.getsizeof(Track.from_dict(sample)), records_strings],
+    ]
+    print_table(
+        f"CD library memory, {args.tracks} tracks",
+        ["representation", "total MiB", "bytes/track", "track object bytes", "artist/album strings"],
+        rows
+    )
+    print(f"\nPer-track saving: {(plain_bytes - records_bytes) / args.tracks:.0f} bytes "
+          f"({1 - records_bytes / plain_bytes:.0%})")
+
+if __name__ == "__main__":
+    main()
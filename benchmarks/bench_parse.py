@@ -0,0 +1,113 @@
+"""Track-line parsing throughput, before and after the compiled-regex parser
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --lines 200000 --repeat 5
+
+"before" is the find/replace parse_track_line the app used to have, kept
+here as legacy_parse_track_line. "after" is mixcd_import.parse_track one
+line at a time, and parse_lines over the whole batch. Each is timed
+--repeat times with the garbage collector off (as timeit does) and the
+fastest run is reported.
+"""
+import argparse
+import gc
+import random
+
+from mixcd_import import parse_track, parse_lines, TrackParseError
+
+from benchmarks.harness import ARTISTS, WORDS, timed, print_table
+
+SUFFIXES = ["", "", "", " EP", " single", " soundtrack", ", single #2"]
+
+def legacy_parse_track_line(track_input):
+    """MixCDDatabase.parse_track_line as it was before the regex tokenizer"""
+    if ' - ' not in track_input:
+        return None
+
+    artist, rest = track_input.split(' - ', 1)
+    artist = artist.strip()
+
+    if '[' in rest and ']' in rest:
+        track = rest[:rest.find('[')].strip()
+        album = rest[rest.find('[')+1:rest.find(']')].strip()
+
+        album_cleanups = [
+            ' single', ' EP', ' soundtrack', ' compilation',
+            'single #1', 'single #2', 'single #3'
+        ]
+
+        for cleanup in album_cleanups:
+            if cleanup in album:
+                album = album.replace(cleanup, '').strip()
+
+        album = album.rstrip(',').strip()
+
+        if not album or album in [',', '.', '-', ':']:
+            album = ""
+    else:
+        track = rest.strip()
+        album = ""
+
+    return {
+        "artist": artist,
+        "track": track,
+        "album": album
+    }
+
+def make_lines(count, seed=0):
+    """Pasted-tracklist lines: mostly with an album, some without, about 1% malformed"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        artist = rng.choice(ARTISTS)
+        track = f"{rng.choice(WORDS)} {rng.choice(WORDS)}"
+        roll = rng.random()
+        if roll < 0.01:
+            lines.append(f"{artist} {track}")
+        elif roll < 0.25:
+            lines.append(f"{artist} - {track}")
+        else:
+            lines.append(f"{artist} - {track} [{rng.choice(WORDS)} {rng.choice(WORDS)}{rng.choice(SUFFIXES)}]")
+    return lines
+
+def best_of(repeat, func, *args):
+    """Run func repeat times; return the last result and the fastest time"""
+    fastest = None
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            result, seconds = timed(func, *args)
+            fastest = seconds if fastest is None else min(fastest, seconds)
+    finally:
+        gc.enable()
+    return result, fastest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure parse_track_line throughput")
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    lines = make_lines(args.lines)
+
+    before, before_seconds = best_of(args.repeat, lambda: [legacy_parse_track_line(line) for line in lines])
+    after, after_seconds = best_of(args.repeat, lambda: [parse_track(line) for line in lines])
+    (tracks, errors), batch_seconds = best_of(args.repeat, parse_lines, lines)
+
+    # Both parsers have to agree on every line the old one accepted
+    differences = sum(1 for old, new in zip(before, after)
+                      if old is not None and not isinstance(new, TrackParseError) and old != new)
+    rejected = sum(1 for result in before if result is None)
+
+    rows = [
+        ["legacy parse_track_line (before)", f"{before_seconds:.2f}", f"{args.lines / before_seconds:,.0f}", rejected],
+        ["parse_track (after)", f"{after_seconds:.2f}", f"{args.lines / after_seconds:,.0f}", len(errors)],
+        ["parse_lines batch (after)", f"{batch_seconds:.2f}", f"{args.lines / batch_seconds:,.0f}", len(errors)],
+    ]
+    print_table(f"Track-line parsing, {args.lines:,} lines", ["parser", "seconds", "lines/s", "rejected"], rows)
+    print(f"\nSpeed-up: {before_seconds / after_seconds:.2f}x per line, "
+          f"{before_seconds / batch_seconds:.2f}x batched; {differences} lines parsed differently")
+
+if __name__ == "__main__":
+    main()
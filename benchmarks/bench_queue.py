@@ -0,0 +1,90 @@
+"""One run per CD versus the scrobble queue, against the local Last.fm stand-in
+
+Run from the repository root:
+
+    python -m benchmarks.bench_queue
+    python -m benchmarks.bench_queue --cds 12 --tracks-per-cd 18 --latency 0.05
+
+Scrobbles the same listening session twice: once with scrobble_mix_cd
+for every CD, then by queueing every CD with enqueue_cd and sending the
+queue with process_queue. Each CD has its own history, so neither run is
+skipped as a duplicate of the other. Everything is written to a
+temporary directory.
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from mixcd_scrobbler import LastFMScrobbler, RateLimiter
+
+from benchmarks.harness import make_library, timed, quiet, print_table
+from benchmarks.lastfm_standin import LastFMStandIn
+from benchmarks.run_benchmarks import authenticate
+
+def session(args):
+    """(tracklist, start_time) per CD, back to back over the last few hours"""
+    cds = list(make_library(args.cds * args.tracks_per_cd, tracks_per_cd=args.tracks_per_cd).values())
+    start_time = datetime.now() - timedelta(minutes=len(cds) * args.tracks_per_cd * 5)
+    plays = []
+    for cd in cds:
+        plays.append((cd['title'], cd['tracks'], start_time))
+        start_time += timedelta(minutes=args.tracks_per_cd * 5)
+    return plays
+
+def make_scrobbler(standin, args, workdir, name):
+    scrobbler = LastFMScrobbler(
+        spool_file=os.path.join(workdir, f"spool_{name}.db"),
+        history_file=os.path.join(workdir, f"history_{name}.db"),
+        durations_file=None,
+        rate_limiter=RateLimiter(rate=args.client_rate, burst=args.client_rate),
+        api_url=standin.url
+    )
+    scrobbler.unsubscribe(scrobbler.console_reporter)
+    with quiet():
+        authenticate(scrobbler, standin)
+    return scrobbler
+
+def one_run_per_cd(scrobbler, plays):
+    return [scrobbler.scrobble_mix_cd(tracks, start_time) for title, tracks, start_time in plays]
+
+def queued(scrobbler, plays):
+    for title, tracks, start_time in plays:
+        scrobbler.enqueue_cd(tracks, start_time, title=title)
+    return [scrobbler.process_queue()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare one scrobble run per CD with the scrobble queue")
+    parser.add_argument('--cds', type=int, default=8)
+    parser.add_argument('--tracks-per-cd', type=int, default=18)
+    parser.add_argument('--latency', type=float, default=0.02, help="stand-in seconds per call (default 0.02)")
+    parser.add_argument('--client-rate', type=float, default=1000,
+                        help="scrobbler RateLimiter calls per second (the app uses 5)")
+    args = parser.parse_args(argv)
+    plays = session(args)
+
+    rows = []
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="mixcd-bench-") as workdir, LastFMStandIn(latency=args.latency) as standin:
+        # The scrobbler reads and writes lastfm_credentials.json in the working directory
+        os.chdir(workdir)
+        try:
+            for name, pipeline in (("scrobble_mix_cd per CD", one_run_per_cd), ("enqueue_cd + process_queue", queued)):
+                scrobbler = make_scrobbler(standin, args, workdir, name.split()[0])
+                standin.reset_stats()
+                try:
+                    with quiet():
+                        runs, seconds = timed(pipeline, scrobbler, plays)
+                finally:
+                    scrobbler.close()
+                calls = standin.stats()['calls']
+                rows.append([name, len(runs), calls.get('track.scrobble', 0), sum(calls.values()),
+                             sum(run['accepted'] for run in runs if run), f"{seconds:.3f}"])
+        finally:
+            os.chdir(original_dir)
+
+    print_table(f"{args.cds} CDs x {args.tracks_per_cd} tracks, stand-in latency {args.latency * 1000:.0f}ms",
+                ["pipeline", "runs", "scrobble calls", "all calls", "accepted", "seconds"], rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Search index build time and query latency on a synthetic library
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --sizes 10000,50000
+"""
+import argparse
+import random
+
+from mixcd_search import SearchIndex
+
+from benchmarks.harness import make_library, summarize, timed, ms, print_table
+
+QUERIES = {
+    'exact': ["left dial", "artist 042", "mix tape 17", "waitress"],
+    'prefix': ["waitr", "answ mach", "artist 04", "unsat"],
+    'typo': ["wiatress", "answerin machnie", "regulr", "imprssed"],
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MixCDDatabase search")
+    parser.add_argument('--sizes', default="1000,10000,50000", help="comma-separated track counts")
+    parser.add_argument('--repeat', type=int, default=50, help="runs of each query")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        library = make_library(size)
+        index = SearchIndex()
+
+        def build():
+            for cd_id, cd_info in library.items():
+                index.add_cd(cd_id, cd_info)
+        _, build_seconds = timed(build)
+
+        rng = random.Random(size)
+        cd_ids = list(library)
+        add_times = [timed(index.add_cd, cd_id, library[cd_id])[1] for cd_id in rng.sample(cd_ids, min(50, len(cd_ids)))]
+
+        for kind, queries in QUERIES.items():
+            samples = []
+            hits = 0
+            for _ in range(args.repeat):
+                for query in queries:
+                    result, seconds = timed(index.search, query)
+                    samples.append(seconds)
+                    hits += len(result)
+            latency = summarize(samples)
+            rows.append([size, ms(build_seconds), ms(summarize(add_times)['p50']), kind,
+                         ms(latency['p50']), ms(latency['p95']), ms(latency['p99']),
+                         f"{hits / len(samples):.1f}"])
+
+    print_table(
+        "SearchIndex",
+        ["tracks", "build ms", "re-index CD ms", "query", "p50 ms", "p95 ms", "p99 ms", "hits/query"],
+        rows
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import math
+import random
+import time
+import tracemalloc
+
+ARTISTS = [f"Artist {i:03d}" for i in range(200)]
+WORDS = ["Left", "Dial", "Sky", "Young", "Regular", "Party", "Waitress", "Bus", "Reach", "Blue",
+         "Unsatisfied", "Answering", "Machine", "Color", "Impressed", "Nobody", "Favorite", "Thing"]
+
+def make_library(track_count, tracks_per_cd=20, seed=0):
+    """Synthetic library of cd_id -> {title, tracks} holding track_count tracks in total
+
+    Artist and album names repeat the way they do on real mix CDs.
+    """
+    rng = random.Random(seed)
+    cds = {}
+    cd_number = 0
+    remaining = track_count
+    while remaining > 0:
+        size = min(tracks_per_cd, remaining)
+        tracks = []
+        for i in range(size):
+            artist = rng.choice(ARTISTS)
+            tracks.append({
+                "artist": artist,
+                "track": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {cd_number}-{i}",
+                "album": f"{artist} Album {rng.randrange(5)}"
+            })
+        cds[f"mix_{cd_number:06d}"] = {"title": f"Mix Tape {cd_number}", "tracks": tracks}
+        cd_number += 1
+        remaining -= size
+    return cds
+
+def make_tracklist(track_count, seed=0):
+    """Flat tracklist of track_count tracks, as scrobble_mix_cd takes it"""
+    return [track for cd in make_library(track_count, seed=seed).values() for track in cd["tracks"]]
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+def summarize(samples):
+    """count, mean and p50/p95/p99/max of a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) if ordered else None,
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else None
+    }
+
+def timed(func, *args, **kwargs):
+    """Call func and return (result, seconds)"""
+    began = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - began
+
+def peak_memory(func, *args, **kwargs):
+    """Call func and return (result, peak bytes allocated while it ran)"""
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the app's console output while a benchmark runs"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.2f}"
+
+def print_table(title, columns, rows):
+    """Print rows (lists of already formatted cells) under a header"""
+    widths = [max(len(str(cell)) for cell in [column] + [row[i] for row in rows])
+              for i, column in enumerate(columns)]
+    print("\n" + title)
+    print("=" * len(title))
+    print("  ".join(str(column).rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
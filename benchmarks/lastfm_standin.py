@@ -0,0 +1,284 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+# Last.fm error codes the stand-in can return
+INVALID_SERVICE = 3
+AUTH_FAILED = 4
+INVALID_PARAMETERS = 6
+INVALID_SESSION = 9
+INVALID_API_KEY = 10
+INVALID_SIGNATURE = 13
+UNAUTHORIZED_TOKEN = 14
+SERVICE_UNAVAILABLE = 16
+RATE_LIMIT_EXCEEDED = 29
+
+# Read-only methods Last.fm answers without a signature
+UNSIGNED_METHODS = {'track.getInfo'}
+
+class LastFMStandIn:
+    """Local stand-in for the Last.fm 2.0 API, for benchmarks and offline testing
+
+    Implements auth.getToken, auth.getSession, user.getInfo, track.getInfo
+    and track.scrobble with the same JSON shapes and signature checks as
+    ws.audioscrobbler.com. track.getInfo is unsigned, as on Last.fm, and
+    answers with a made-up but stable duration per track (see
+    track_duration). Every token is treated as authorized straight
+    away, so auth.getSession works without a browser.
+
+    latency (plus up to jitter) seconds are added to every call, error_rate
+    of calls fail with error 16, and if rate_limit is set, calls beyond
+    that many per second get error 29 with HTTP 429.
+    """
+    def __init__(self, api_key="bench-api-key", api_secret="bench-api-secret", username="bench-user",
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, host='127.0.0.1', port=0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.username = username
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.host = host
+        self.port = port
+
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.sessions = set()
+        self.allowance = rate_limit or 0
+        self.last_check = time.monotonic()
+        self.server = None
+        self.thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear the request counters"""
+        with self.lock:
+            self.calls = {}
+            self.scrobbles = 0
+            self.injected_errors = 0
+            self.rate_limited = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': dict(self.calls),
+                'scrobbles': self.scrobbles,
+                'injected_errors': self.injected_errors,
+                'rate_limited': self.rate_limited
+            }
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.server.server_address[1]}/2.0/"
+
+    def start(self):
+        """Start serving on a background thread and return the API URL"""
+        handler = type('Handler', (StandInRequestHandler,), {'standin': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join(timeout=5)
+            self.server = None
+            self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def create_session(self):
+        """Issue a session key directly, skipping the token handshake"""
+        key = uuid.uuid4().hex
+        with self.lock:
+            self.sessions.add(key)
+        return key
+
+    def signature(self, params):
+        """Same md5 signature Last.fm expects: sorted key+value pairs, then the secret"""
+        sig_params = {k: v for k, v in params.items() if k not in ('format', 'api_sig', 'callback')}
+        to_hash = ''.join(f"{k}{v}" for k, v in sorted(sig_params.items())) + self.api_secret
+        return hashlib.md5(to_hash.encode('utf-8')).hexdigest()
+
+    def over_rate_limit(self):
+        """Token bucket of rate_limit calls per second; True if this call is over it"""
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate_limit, self.allowance + (now - self.last_check) * self.rate_limit)
+            self.last_check = now
+            if self.allowance < 1:
+                self.rate_limited += 1
+                return True
+            self.allowance -= 1
+            return False
+
+    def handle(self, params):
+        """Answer one API call; returns (http_status, response_dict)"""
+        method = params.get('method', '')
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if self.over_rate_limit():
+            return 429, error(RATE_LIMIT_EXCEEDED, "Rate limit exceeded")
+        if self.error_rate and random.random() < self.error_rate:
+            with self.lock:
+                self.injected_errors += 1
+            return 500, error(SERVICE_UNAVAILABLE, "Service temporarily unavailable")
+
+        handler = {
+            'auth.getToken': self.get_token,
+            'auth.getSession': self.get_session,
+            'user.getInfo': self.get_user_info,
+            'track.getInfo': self.get_track_info,
+            'track.scrobble': self.scrobble
+        }.get(method)
+        if handler is None:
+            return 400, error(INVALID_SERVICE, "Invalid service - This service does not exist")
+        if params.get('api_key') != self.api_key:
+            return 403, error(INVALID_API_KEY, "Invalid API key - You must be granted a valid key by last.fm")
+        if method not in UNSIGNED_METHODS and params.get('api_sig') != self.signature(params):
+            return 403, error(INVALID_SIGNATURE, "Invalid method signature supplied")
+        return handler(params)
+
+    def check_session(self, params):
+        with self.lock:
+            return params.get('sk') in self.sessions
+
+    def get_token(self, params):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens.add(token)
+        return 200, {'token': token}
+
+    def get_session(self, params):
+        with self.lock:
+            authorized = params.get('token') in self.tokens
+            if authorized:
+                self.tokens.discard(params['token'])
+        if not authorized:
+            return 403, error(UNAUTHORIZED_TOKEN, "Unauthorized Token - This token has not been issued")
+        return 200, {'session': {'name': self.username, 'key': self.create_session(), 'subscriber': 0}}
+
+    def get_user_info(self, params):
+        if not self.check_session(params):
+            return 403, error(INVALID_SESSION, "Invalid session key - Please re-authenticate")
+        return 200, {'user': {'name': self.username, 'playcount': str(self.scrobbles), 'type': 'user'}}
+
+    def track_duration(self, artist, track):
+        """Duration in seconds the stand-in reports for a track, None for about one in ten"""
+        digest = hashlib.md5(f"{artist.casefold()}\n{track.casefold()}".encode('utf-8')).digest()
+        if digest[0] < 26:
+            return None
+        return 150 + int.from_bytes(digest[1:3], 'big') % 211
+
+    def get_track_info(self, params):
+        artist = params.get('artist', '')
+        track = params.get('track', '')
+        if not artist or not track:
+            return 400, error(INVALID_PARAMETERS, "Track not found")
+        duration = self.track_duration(artist, track)
+        return 200, {'track': {
+            'name': track,
+            'url': f"https://www.last.fm/music/{artist}/_/{track}",
+            'duration': str((duration or 0) * 1000),
+            'listeners': '0',
+            'playcount': '0',
+            'artist': {'name': artist, 'url': f"https://www.last.fm/music/{artist}"}
+        }}
+
+    def scrobble(self, params):
+        if not self.check_session(params):
+            return 403, error(INVALID_SESSION, "Invalid session key - Please re-authenticate")
+
+        items = []
+        i = 0
+        while f'artist[{i}]' in params:
+            items.append({
+                'artist': {'corrected': '0', '#text': params[f'artist[{i}]']},
+                'track': {'corrected': '0', '#text': params.get(f'track[{i}]', '')},
+                'album': {'corrected': '0', '#text': params.get(f'album[{i}]', '')},
+                'timestamp': params.get(f'timestamp[{i}]', ''),
+                'ignoredMessage': {'code': '0', '#text': ''}
+            })
+            i += 1
+        if not items:
+            return 400, error(INVALID_PARAMETERS, "Invalid parameters - Your request is missing a required parameter")
+
+        with self.lock:
+            self.scrobbles += len(items)
+        return 200, {'scrobbles': {
+            'scrobble': items if len(items) > 1 else items[0],
+            '@attr': {'accepted': len(items), 'ignored': 0}
+        }}
+
+def error(code, message):
+    return {'error': code, 'message': message}
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for LastFMStandIn (keep-alive, GET and POST)"""
+    protocol_version = 'HTTP/1.1'
+    standin = None
+    # Send headers and body in one segment; split writes hit delayed ACKs and add ~40ms per call
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, query):
+        params = {key: values[-1] for key, values in parse_qs(query, keep_blank_values=True).items()}
+        status, data = self.standin.handle(params)
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.reply(urlparse(self.path).query)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.reply(self.rfile.read(length).decode('utf-8'))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Last.fm API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds per call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls failing with error 16")
+    parser.add_argument('--rate-limit', type=float, default=None, help="calls per second before error 29")
+    args = parser.parse_args()
+
+    standin = LastFMStandIn(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit, port=args.port)
+    url = standin.start()
+    print(f"✓ Last.fm stand-in listening on {url}")
+    print(f"  API key: {standin.api_key}  Shared secret: {standin.api_secret}")
+    try:
+        standin.thread.join()
+    except KeyboardInterrupt:
+        standin.stop()
@@ -0,0 +1,224 @@
+"""Scrobbling and library benchmarks against a local Last.fm stand-in
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1,25,1000 --latency 0.05 --error-rate 0.02
+
+Nothing is sent to ws.audioscrobbler.com, and everything the app writes
+(spool, credentials, libraries) goes to a temporary directory.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from mixcd_scrobbler import LastFMScrobbler, MixCDDatabase, RateLimiter
+from mixcd_storage import JSONStorage, BinarySnapshotStorage, SQLiteStorage
+
+from benchmarks.harness import make_library, make_tracklist, summarize, timed, peak_memory, quiet, ms, print_table
+from benchmarks.lastfm_standin import LastFMStandIn
+
+DEFAULT_SIZES = "1,25,1000,100000"
+
+def authenticate(scrobbler, standin):
+    """Run the token/session handshake against the stand-in (no browser involved)"""
+    scrobbler.api_key = standin.api_key
+    scrobbler.api_secret = standin.api_secret
+
+    params = {'method': 'auth.getToken', 'api_key': scrobbler.api_key, 'format': 'json'}
+    params['api_sig'] = scrobbler.generate_api_signature(params)
+    token = scrobbler.api_request(params).json()['token']
+
+    params = {'method': 'auth.getSession', 'api_key': scrobbler.api_key, 'token': token, 'format': 'json'}
+    params['api_sig'] = scrobbler.generate_api_signature(params)
+    scrobbler.session_key = scrobbler.api_request(params).json()['session']['key']
+
+def time_requests(scrobbler):
+    """Record the latency of every HTTP call the scrobbler makes
+
+    Returns a dict of method -> list of seconds that fills up as calls are made.
+    """
+    latencies = {}
+    send_request = scrobbler.send_request
+
+    def send_timed(params, http_method='GET'):
+        began = time.perf_counter()
+        try:
+            return send_request(params, http_method)
+        finally:
+            latencies.setdefault(params.get('method', ''), []).append(time.perf_counter() - began)
+
+    scrobbler.send_request = send_timed
+    return latencies
+
+def bench_scrobble(standin, size, args, workdir):
+    """Scrobble a size-track mix through scrobble_mix_cd and measure it"""
+    scrobbler = LastFMScrobbler(
+        spool_file=os.path.join(workdir, f"spool_{size}.db"),
+        history_file=os.path.join(workdir, f"history_{size}.db"),
+        # Duration lookups are measured on their own in bench_durations
+        durations_file=None,
+        rate_limiter=RateLimiter(rate=args.client_rate, burst=args.client_rate),
+        retry_base_delay=0.05, retry_max_delay=1,
+        api_url=standin.url
+    )
+    scrobbler.unsubscribe(scrobbler.console_reporter)
+    latencies = time_requests(scrobbler)
+    tracklist = make_tracklist(size)
+    start_time = datetime.now() - timedelta(minutes=4 * size)
+
+    try:
+        with quiet():
+            authenticate(scrobbler, standin)
+            latencies.clear()
+            standin.reset_stats()
+            stats, seconds = timed(scrobbler.scrobble_mix_cd, tracklist, start_time)
+    finally:
+        scrobbler.close()
+
+    scrobble_latency = summarize(latencies.get('track.scrobble', []))
+    preflight = summarize(latencies.get('user.getInfo', []))
+    return {
+        'tracks': size,
+        'seconds': seconds,
+        'tracks_per_second': size / seconds if seconds else None,
+        'http_calls': sum(len(samples) for samples in latencies.values()),
+        'preflight_latency': preflight,
+        'scrobble_latency': scrobble_latency,
+        'accepted': stats['accepted'] if stats else 0,
+        'failed': stats['failed'] if stats else size,
+        'retries': sum(scrobbler.retry_counts.values()),
+        'standin': standin.stats()
+    }
+
+def run_scrobble_suite(sizes, args, workdir):
+    standin = LastFMStandIn(latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit)
+    results = []
+    with standin:
+        for size in sizes:
+            results.append(bench_scrobble(standin, size, args, workdir))
+
+    print_table(
+        f"scrobble_mix_cd (stand-in latency {args.latency * 1000:.0f}ms, error rate {args.error_rate:.0%})",
+        ["tracks", "calls", "seconds", "tracks/s", "preflight ms",
+         "scrobble p50 ms", "p95 ms", "p99 ms", "accepted", "failed", "retries"],
+        [[r['tracks'], r['http_calls'], f"{r['seconds']:.3f}", f"{r['tracks_per_second']:.0f}",
+          ms(r['preflight_latency']['mean']), ms(r['scrobble_latency']['p50']),
+          ms(r['scrobble_latency']['p95']), ms(r['scrobble_latency']['p99']),
+          r['accepted'], r['failed'], r['retries']] for r in results]
+    )
+    return results
+
+def bench_operations(db, cd_ids, rng, new_cd_prefix, samples=50):
+    """Time get_cd, add_cd and find_tracks on an open MixCDDatabase"""
+    get_times = []
+    for cd_id in (rng.choice(cd_ids) for _ in range(samples * 4)):
+        get_times.append(timed(db.get_cd, cd_id)[1])
+
+    add_times = []
+    for i in range(samples):
+        tracks = make_library(12, tracks_per_cd=12, seed=i)["mix_000000"]["tracks"]
+        add_times.append(timed(db.add_cd, f"{new_cd_prefix}_{i}", f"Added {i}", tracks)[1])
+
+    find_times = []
+    for _ in range(samples // 2 or 1):
+        sample = rng.choice(db.get_cd(rng.choice(cd_ids))["tracks"])
+        find_times.append(timed(db.find_tracks, artist=sample["artist"])[1])
+
+    return summarize(get_times), summarize(add_times), summarize(find_times)
+
+def bench_database(size, workdir):
+    """Build, open and use a size-track library with each storage backend"""
+    library = make_library(size)
+    cd_ids = list(library)
+    rng = random.Random(size)
+    results = []
+
+    def measure(backend, write, open_storage):
+        """write() builds the library and returns its storage; open_storage() reopens it"""
+        with quiet():
+            storage, write_seconds = timed(write)
+            storage.close()
+            _, first_open = timed(MixCDDatabase, storage=open_storage())
+            db, open_bytes = peak_memory(MixCDDatabase, storage=open_storage())
+            db.storage.close()
+            db, open_seconds = timed(MixCDDatabase, storage=open_storage())
+            get, add, find = bench_operations(db, cd_ids, rng, f"{backend}_added")
+            db.storage.close()
+        results.append({'backend': backend, 'tracks': size, 'cds': len(cd_ids), 'write_seconds': write_seconds,
+                        'first_open_seconds': first_open, 'open_seconds': open_seconds, 'open_bytes': open_bytes,
+                        'get_cd': get, 'add_cd': add, 'find_tracks': find})
+
+    def write_json(json_file):
+        storage = JSONStorage(json_file)
+        storage.compact(library)
+        # Start without the sidecar so the first open shows the full-parse cost
+        os.remove(json_file + ".idx")
+        return storage
+
+    json_file = os.path.join(workdir, f"library_{size}.json")
+    measure('json', lambda: write_json(json_file), lambda: JSONStorage(json_file))
+
+    binary_file = os.path.join(workdir, f"library_{size}_binary.json")
+    measure('binary', lambda: write_json(binary_file), lambda: BinarySnapshotStorage(binary_file))
+
+    sqlite_file = os.path.join(workdir, f"library_{size}.db")
+    measure('sqlite', lambda: SQLiteStorage(sqlite_file, migrate_from=json_file), lambda: SQLiteStorage(sqlite_file))
+    return results
+
+def run_database_suite(sizes, workdir):
+    results = []
+    for size in sizes:
+        results.extend(bench_database(size, workdir))
+
+    print_table(
+        "MixCDDatabase (write = JSON snapshot, or migration for sqlite; first open builds indexes)",
+        ["backend", "tracks", "cds", "write ms", "first open ms", "open ms", "open KiB",
+         "get_cd p50 ms", "p99 ms", "add_cd p50 ms", "p99 ms", "find p50 ms", "p99 ms"],
+        [[r['backend'], r['tracks'], r['cds'], ms(r['write_seconds']), ms(r['first_open_seconds']),
+          ms(r['open_seconds']), f"{r['open_bytes'] / 1024:.0f}", ms(r['get_cd']['p50']), ms(r['get_cd']['p99']),
+          ms(r['add_cd']['p50']), ms(r['add_cd']['p99']),
+          ms(r['find_tracks']['p50']), ms(r['find_tracks']['p99'])] for r in results]
+    )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scrobbling and the CD library against a local Last.fm stand-in")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"comma-separated track counts (default {DEFAULT_SIZES})")
+    parser.add_argument('--suite', choices=['all', 'scrobble', 'database'], default='all')
+    parser.add_argument('--latency', type=float, default=0.005, help="stand-in seconds per call (default 0.005)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="stand-in extra random seconds per call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stand-in calls failing with error 16")
+    parser.add_argument('--rate-limit', type=float, default=None, help="stand-in calls per second before error 29")
+    parser.add_argument('--client-rate', type=float, default=1000,
+                        help="scrobbler RateLimiter calls per second (the app uses 5)")
+    parser.add_argument('--json', metavar='FILE', help="also write the results to FILE as JSON")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    results = {}
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="mixcd-bench-") as workdir:
+        # The scrobbler reads and writes lastfm_credentials.json in the working directory
+        os.chdir(workdir)
+        try:
+            if args.suite in ('all', 'scrobble'):
+                results['scrobble'] = run_scrobble_suite(sizes, args, workdir)
+            if args.suite in ('all', 'database'):
+                results['database'] = run_database_suite(sizes, workdir)
+        finally:
+            os.chdir(original_dir)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+    return results
+
+if __name__ == "__main__":
+    main()
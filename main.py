@@ -1,3 +1,8 @@
+import time
+
+# Taken before anything else is imported so the startup report covers import time too
+STARTUP_BEGAN = time.perf_counter()
+
 import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
@@ -8,26 +13,56 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.spinner import Spinner
 from kivy.uix.checkbox import CheckBox
 from kivy.uix.popup import Popup
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.clock import Clock
 from kivy.logger import Logger
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
+import asyncio
 import threading
 import json
 import os
 
 # Import your existing classes (these would need to be in the same APK)
 try:
-    from mixcd_scrobbler import LastFMScrobbler, MixCDDatabase
+    from mixcd_scrobbler import LastFMScrobbler, MixCDDatabase, TrackResult, RunFinished
+    from async_scrobbler import AsyncLastFMScrobbler
 except ImportError:
     # Fallback for development
     Logger.warning("Could not import scrobbler classes - using mock for development")
     
+    class TrackResult:
+        pass
+    
+    class RunFinished:
+        pass
+    
     class LastFMScrobbler:
-        def ensure_authenticated(self):
+        def ensure_authenticated(self, allow_offline=False, force=False):
             return True
-        def scrobble_mix_cd(self, tracks, start_time, track_range=None):
-            Logger.info(f"Mock scrobble: {len(tracks)} tracks at {start_time}")
+        def scrobble_mix_cd(self, tracks, start_time, track_range=None, end_time=None):
+            Logger.info(f"Mock scrobble: {len(tracks)} tracks at {start_time or end_time}")
+        def start_spool_flusher(self):
+            pass
+        def start_queue_worker(self):
+            pass
+        def enqueue_cd(self, tracks, start_time, track_range=None, title=None, end_time=None):
+            Logger.info(f"Mock queue: {title} at {start_time or end_time}")
+        def subscribe(self, callback):
+            pass
+        def close(self):
+            pass
+    
+    class AsyncLastFMScrobbler:
+        def __init__(self, scrobbler):
+            self.scrobbler = scrobbler
+        def submit(self, coro):
+            threading.Thread(target=asyncio.run, args=(coro,), daemon=True).start()
+        async def scrobble_mix_cd(self, tracks, start_time, track_range=None, end_time=None):
+            self.scrobbler.scrobble_mix_cd(tracks, start_time, track_range=track_range, end_time=end_time)
+        def close(self):
+            self.scrobbler.close()
     
     class MixCDDatabase:
         def __init__(self):
@@ -42,28 +77,88 @@ except ImportError:
             }
         def save_database(self):
             pass
+        def get_cd_summaries(self):
+            return [(cd_id, cd_info['title'], len(cd_info['tracks'])) for cd_id, cd_info in self.cds.items()]
+        def get_cd_labels(self):
+            return [f"{title} ({track_count} tracks)" for cd_id, title, track_count in self.get_cd_summaries()]
+        def get_cd_id_for_label(self, label):
+            return dict(zip(self.get_cd_labels(), self.cds)).get(label)
         def parse_track_line(self, line):
             if ' - ' in line:
                 parts = line.split(' - ', 1)
                 return {"artist": parts[0], "track": parts[1], "album": ""}
             return None
 
-class StatusConsole(ScrollView):
-    """Scrollable console for status messages"""
+class StartupTimer:
+    """Records how long each startup phase took so it can be logged on device"""
+    def __init__(self, began):
+        self.began = began
+        self.marks = {}
+    
+    def mark(self, phase):
+        """Record that a phase finished now"""
+        self.marks[phase] = time.perf_counter() - self.began
+    
+    def has(self, *phases):
+        return all(phase in self.marks for phase in phases)
+    
+    def report(self):
+        """One-line summary of every phase in the order they finished"""
+        phases = sorted(self.marks.items(), key=lambda item: item[1])
+        return "Startup: " + ", ".join(f"{phase} {elapsed * 1000:.0f} ms" for phase, elapsed in phases)
+
+startup_timer = StartupTimer(STARTUP_BEGAN)
+
+# Height of a console row holding a single line of text
+CONSOLE_LINE_HEIGHT = 28
+
+class ConsoleLine(Label):
+    """One line of the status console; grows to fit messages that wrap on narrow screens"""
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.console_text = Label(
-            text="🎵 Mix CD Scrobbler Ready\n",
-            text_size=(None, None),
-            valign='top',
-            markup=True
+        self.halign = 'left'
+        self.valign = 'middle'
+        self.markup = True
+        self.size_hint_y = None
+        self.height = CONSOLE_LINE_HEIGHT
+        self.bind(width=lambda instance, width: setattr(self, 'text_size', (width, None)))
+        self.bind(texture_size=lambda instance, texture_size: setattr(
+            self, 'height', max(CONSOLE_LINE_HEIGHT, texture_size[1])))
+
+class StatusConsole(RecycleView):
+    """Scrollable console for status messages
+    
+    Keeps only the last max_lines lines in a ring buffer and renders them
+    through a RecycleView, so only the visible lines have widgets. Messages
+    can be added from any thread; they are queued and applied once per frame.
+    """
+    def __init__(self, max_lines=500, **kwargs):
+        super().__init__(**kwargs)
+        self.lines = deque(["🎵 Mix CD Scrobbler Ready"], maxlen=max_lines)
+        self.pending = deque()
+        self.flush_trigger = Clock.create_trigger(self.flush_pending)
+        
+        self.viewclass = ConsoleLine
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, CONSOLE_LINE_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None
         )
-        self.add_widget(self.console_text)
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.data = [{'text': line} for line in self.lines]
     
     def add_message(self, message):
         """Add a message to the console"""
-        current_text = self.console_text.text
-        self.console_text.text = current_text + message + "\n"
+        self.pending.append(message)
+        self.flush_trigger()
+    
+    def flush_pending(self, dt):
+        """Apply every message queued since the last frame in one update"""
+        while self.pending:
+            self.lines.extend(self.pending.popleft().split("\n"))
+        self.data = [{'text': line} for line in self.lines]
         # Auto-scroll to bottom
         Clock.schedule_once(lambda dt: setattr(self, 'scroll_y', 0), 0.1)
 
@@ -290,22 +385,16 @@ class TimeSelectionLayout(GridLayout):
             self.now_checkbox.active = False
             self.today_checkbox.active = False
     
-    def get_start_time(self, cd_info, track_selection):
-        """Get start time based on selection"""
+    def get_listening_times(self):
+        """Get (start_time, end_time) from the selection, one of them None; None if invalid"""
         if self.time_option == "now":
-            # Calculate backwards
-            if isinstance(track_selection, tuple):
-                num_tracks = track_selection[1] - track_selection[0] + 1
-            elif isinstance(track_selection, list):
-                num_tracks = len(track_selection)
-            else:
-                num_tracks = len(cd_info['tracks'])
-            return datetime.now() - timedelta(minutes=num_tracks * 4)
+            # Finished just now: the scrobbler plans backwards once it knows the track lengths
+            return None, datetime.now()
         
         elif self.time_option == "today":
             try:
                 hour = int(self.hour_input.text)
-                return datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+                return datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0), None
             except ValueError:
                 return None
         
@@ -314,15 +403,19 @@ class TimeSelectionLayout(GridLayout):
                 date_str = self.date_input.text
                 time_str = self.time_input.text
                 datetime_str = f"{date_str} {time_str}"
-                return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M")
+                return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M"), None
             except ValueError:
                 return None
 
 class MixCDScrobblerApp(App):
     def build(self):
-        # Initialize core components
-        self.scrobbler = LastFMScrobbler()
-        self.cd_db = MixCDDatabase()
+        startup_timer.mark("imports")
+        
+        # Core components are loaded in the background once the UI is up
+        self.scrobbler = None
+        self.async_scrobbler = None
+        self.cd_db = None
+        self.load_error = None
         
         # Main layout
         main_layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -341,8 +434,8 @@ class MixCDScrobblerApp(App):
         cd_layout.add_widget(Label(text="CD:", size_hint_x=None, width=50))
         
         self.cd_spinner = Spinner(
-            text="Select CD...",
-            values=self.get_cd_list()
+            text="Loading CDs...",
+            values=[]
         )
         cd_layout.add_widget(self.cd_spinner)
         
@@ -381,6 +474,10 @@ class MixCDScrobblerApp(App):
         scrobble_btn.bind(on_press=self.scrobble_cd)
         button_layout.add_widget(scrobble_btn)
         
+        queue_btn = Button(text="Queue")
+        queue_btn.bind(on_press=self.queue_cd)
+        button_layout.add_widget(queue_btn)
+        
         main_layout.add_widget(button_layout)
         
         # Status Console
@@ -390,17 +487,104 @@ class MixCDScrobblerApp(App):
         self.console = StatusConsole()
         main_layout.add_widget(self.console)
         
+        # Render first, then read credentials and the CD library off the UI thread
+        Clock.schedule_once(self.on_first_frame, 0)
+        threading.Thread(target=self.load_core, daemon=True).start()
+        
         return main_layout
     
+    def load_core(self):
+        """Load credentials and the CD library (runs on a background thread)"""
+        scrobbler = None
+        try:
+            scrobbler = LastFMScrobbler()
+            cd_db = MixCDDatabase()
+        except Exception as e:
+            # e.g. a corrupt spool, history or duration cache database
+            Logger.exception("MixCDScrobbler: could not load the scrobbler or CD library")
+            if scrobbler is not None:
+                scrobbler.close()
+            error = str(e)
+            Clock.schedule_once(lambda dt: self.on_core_failed(error), 0)
+            return
+        startup_timer.mark("library loaded")
+        Clock.schedule_once(lambda dt: self.on_core_loaded(scrobbler, cd_db), 0)
+    
+    def on_core_failed(self, error):
+        """Show that background loading failed instead of staying on 'Loading CDs...'"""
+        self.load_error = error
+        self.cd_spinner.text = "Could not load CDs"
+        self.console.add_message(f"✗ Could not start: {error}")
+    
+    def on_core_loaded(self, scrobbler, cd_db):
+        """Hook up the loaded components and fill in the CD list"""
+        self.scrobbler = scrobbler
+        self.async_scrobbler = AsyncLastFMScrobbler(scrobbler)
+        self.cd_db = cd_db
+        
+        # Per-track progress comes in as events from the scrobbler's worker threads
+        self.scrobbler.subscribe(self.on_scrobble_event)
+        
+        # Send any scrobbles that were queued while offline, and any CDs left in the scrobble queue
+        self.scrobbler.start_spool_flusher()
+        self.scrobbler.start_queue_worker()
+        
+        self.cd_spinner.values = self.get_cd_list()
+        self.cd_spinner.text = "Select CD..."
+        self.report_startup()
+    
+    def on_scrobble_event(self, event):
+        """Show scrobble progress events in the console"""
+        if isinstance(event, TrackResult):
+            symbol = {'accepted': '✓', 'ignored': '⚠', 'failed': '✗', 'duplicate': '↺'}[event.outcome]
+            scrobble = event.scrobble
+            number = f"{event.track_number}. " if event.track_number else ""
+            self.console.add_message(f"  {symbol} {number}{scrobble['artist']} - {scrobble['track']}")
+        elif isinstance(event, RunFinished):
+            stats = event.stats
+            self.console.add_message(
+                f"  {stats['accepted'] + stats['ignored']}/{stats['total']} scrobbled "
+                f"in {stats['elapsed_seconds']:.1f}s ({stats['requests']} request(s))"
+            )
+            if stats['queued_for_retry']:
+                self.console.add_message(f"  ⏳ {stats['queued_for_retry']} queued, will retry when online")
+            if stats.get('duplicates'):
+                self.console.add_message(f"  ↺ {stats['duplicates']} already scrobbled, skipped")
+    
+    def on_first_frame(self, dt):
+        startup_timer.mark("first frame")
+        self.report_startup()
+    
+    def report_startup(self):
+        """Log startup timings once both the first frame and the library are ready"""
+        if startup_timer.has("first frame", "library loaded"):
+            report = startup_timer.report()
+            Logger.info(f"MixCDScrobbler: {report}")
+            self.console.add_message(report)
+    
+    def is_ready(self):
+        """Check that background loading finished, telling the user if it hasn't"""
+        if self.load_error is not None:
+            self.console.add_message(f"✗ Could not start: {self.load_error}")
+            return False
+        if self.cd_db is None:
+            self.console.add_message("⏳ Still loading, try again in a moment")
+            return False
+        return True
+    
+    def on_stop(self):
+        """Stop the scrobble engine and release pooled connections when the app closes"""
+        if self.async_scrobbler:
+            self.async_scrobbler.close()
+    
     def get_cd_list(self):
         """Get list of CDs for spinner"""
-        cd_list = []
-        for cd_id, cd_info in self.cd_db.cds.items():
-            cd_list.append(f"{cd_info['title']} ({len(cd_info['tracks'])} tracks)")
-        return cd_list or ["No CDs available"]
+        return self.cd_db.get_cd_labels() or ["No CDs available"]
     
     def refresh_cd_list(self, instance=None):
         """Refresh the CD spinner"""
+        if self.cd_db is None:
+            return
         self.cd_spinner.values = self.get_cd_list()
         if self.cd_spinner.values and self.cd_spinner.values[0] != "No CDs available":
             self.cd_spinner.text = self.cd_spinner.values[0]
@@ -410,18 +594,20 @@ class MixCDScrobblerApp(App):
         if not self.cd_spinner.text or self.cd_spinner.text == "Select CD..." or self.cd_spinner.text == "No CDs available":
             return None, None
         
-        # Find CD by title
-        for cd_id, cd_info in self.cd_db.cds.items():
-            cd_display = f"{cd_info['title']} ({len(cd_info['tracks'])} tracks)"
-            if cd_display == self.cd_spinner.text:
-                return cd_id, cd_info
-        return None, None
+        # Labels are unique, so this is a dict lookup; only the selected tracklist gets loaded
+        cd_id = self.cd_db.get_cd_id_for_label(self.cd_spinner.text)
+        if cd_id is None:
+            return None, None
+        return cd_id, self.cd_db.cds[cd_id]
     
     def test_auth(self, instance):
         """Test authentication"""
+        if not self.is_ready():
+            return
+        
         def run_test():
             self.console.add_message("Testing Last.fm authentication...")
-            if self.scrobbler.ensure_authenticated():
+            if self.scrobbler.ensure_authenticated(force=True):
                 self.console.add_message("✓ Authentication successful!")
             else:
                 self.console.add_message("✗ Authentication failed")
@@ -430,11 +616,16 @@ class MixCDScrobblerApp(App):
     
     def show_add_cd(self, instance):
         """Show add CD popup"""
+        if not self.is_ready():
+            return
         popup = AddCDPopup(self.cd_db, self.refresh_cd_list)
         popup.open()
     
     def scrobble_cd(self, instance):
         """Scrobble the selected CD"""
+        if not self.is_ready():
+            return
+        
         cd_id, cd_info = self.get_selected_cd_info()
         if not cd_info:
             self.console.add_message("✗ Please select a CD first")
@@ -445,27 +636,64 @@ class MixCDScrobblerApp(App):
             self.console.add_message("✗ Invalid track selection")
             return
         
-        start_time = self.time_selection.get_start_time(cd_info, track_selection)
-        if start_time is None:
+        times = self.time_selection.get_listening_times()
+        if times is None:
             self.console.add_message("✗ Invalid time selection")
             return
+        start_time, end_time = times
         
-        def run_scrobble():
+        async def run_scrobble():
             self.console.add_message(f"Starting scrobble: {cd_info['title']}")
             
             try:
                 if isinstance(track_selection, tuple):
-                    self.scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, track_range=track_selection)
+                    await self.async_scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, track_range=track_selection,
+                                                               end_time=end_time)
                 elif isinstance(track_selection, list):
-                    self.scrobbler.scrobble_mix_cd(track_selection, start_time)
+                    await self.async_scrobbler.scrobble_mix_cd(track_selection, start_time, end_time=end_time)
                 else:
-                    self.scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time)
+                    await self.async_scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, end_time=end_time)
                 
                 self.console.add_message("✓ Scrobbling completed!")
             except Exception as e:
                 self.console.add_message(f"✗ Scrobbling failed: {str(e)}")
         
-        threading.Thread(target=run_scrobble, daemon=True).start()
+        # All scrobbles share one background event loop, so several CDs can be queued at once
+        self.async_scrobbler.submit(run_scrobble())
+
+    def queue_cd(self, instance):
+        """Add the selected CD to the scrobble queue; the queue worker sends the session as one run"""
+        if not self.is_ready():
+            return
+        
+        cd_id, cd_info = self.get_selected_cd_info()
+        if not cd_info:
+            self.console.add_message("✗ Please select a CD first")
+            return
+        
+        track_selection = self.track_selection.get_track_selection(cd_info)
+        if track_selection is False:
+            self.console.add_message("✗ Invalid track selection")
+            return
+        
+        times = self.time_selection.get_listening_times()
+        if times is None:
+            self.console.add_message("✗ Invalid time selection")
+            return
+        start_time, end_time = times
+        
+        if isinstance(track_selection, tuple):
+            job_id = self.scrobbler.enqueue_cd(cd_info['tracks'], start_time, track_range=track_selection,
+                                               title=cd_info['title'], end_time=end_time)
+        elif isinstance(track_selection, list):
+            job_id = self.scrobbler.enqueue_cd(track_selection, start_time, title=cd_info['title'], end_time=end_time)
+        else:
+            job_id = self.scrobbler.enqueue_cd(cd_info['tracks'], start_time, title=cd_info['title'], end_time=end_time)
+        
+        if job_id is None:
+            self.console.add_message(f"✗ Could not queue {cd_info['title']} (overlaps a queued CD?)")
+        else:
+            self.console.add_message(f"✓ Queued {cd_info['title']}")
 
 if __name__ == "__main__":
     MixCDScrobblerApp().run()
\ No newline at end of file
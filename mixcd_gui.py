@@ -2,12 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from tkinter import font
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import io
+import queue
 
 # Import your existing classes
 from mixcd_scrobbler import LastFMScrobbler, MixCDDatabase
+from async_scrobbler import AsyncLastFMScrobbler
 
 class MixCDGUI:
     def __init__(self, root):
@@ -17,6 +19,7 @@ class MixCDGUI:
         
         # Initialize your existing classes
         self.scrobbler = LastFMScrobbler()
+        self.async_scrobbler = AsyncLastFMScrobbler(self.scrobbler)
         self.cd_db = MixCDDatabase()
         
         # Variables
@@ -26,6 +29,10 @@ class MixCDGUI:
         
         self.setup_ui()
         self.refresh_cd_list()
+        
+        # Send any scrobbles that were queued while offline, and any CDs left in the scrobble queue
+        self.scrobbler.start_spool_flusher()
+        self.scrobbler.start_queue_worker()
     
     def setup_ui(self):
         # Main container
@@ -96,7 +103,9 @@ class MixCDGUI:
         
         ttk.Button(button_frame, text="Test Authentication", command=self.test_auth).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(button_frame, text="Add New CD", command=self.show_add_cd_window).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(button_frame, text="Scrobble CD", command=self.scrobble_cd, style="Accent.TButton").pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Scrobble CD", command=self.scrobble_cd, style="Accent.TButton").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Queue CD", command=self.queue_cd).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Send Queue", command=self.scrobbler.flush_queue).pack(side=tk.LEFT)
         
         # Status/Output Section
         status_frame = ttk.LabelFrame(main_frame, text="Status", padding="10")
@@ -111,27 +120,52 @@ class MixCDGUI:
         # Redirect print statements to status text
         self.redirect_output()
     
-    def redirect_output(self):
-        """Redirect print statements to the status text widget"""
-        class TextRedirector:
-            def __init__(self, widget):
-                self.widget = widget
+    def redirect_output(self, max_lines=1000, interval_ms=100):
+        """Redirect print statements to the status text widget
+        
+        Worker threads only put text on a queue; the Tk main loop drains it
+        every interval_ms, inserts everything queued in one go and keeps the
+        widget to the last max_lines lines.
+        """
+        class QueueRedirector:
+            def __init__(self, output_queue):
+                self.queue = output_queue
             
             def write(self, string):
-                self.widget.insert(tk.END, string)
-                self.widget.see(tk.END)
-                self.widget.update()
+                self.queue.put(string)
             
             def flush(self):
                 pass
         
-        sys.stdout = TextRedirector(self.status_text)
+        self.output_queue = queue.Queue()
+        self.max_output_lines = max_lines
+        self.output_interval_ms = interval_ms
+        sys.stdout = QueueRedirector(self.output_queue)
+        self.root.after(interval_ms, self.drain_output)
+    
+    def drain_output(self):
+        """Move queued output into the status widget (runs on the Tk main loop)"""
+        chunks = []
+        try:
+            while True:
+                chunks.append(self.output_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if chunks:
+            self.status_text.insert(tk.END, "".join(chunks))
+            
+            # Drop the oldest lines once we go over the cap
+            line_count = int(self.status_text.index("end-1c").split(".")[0])
+            if line_count > self.max_output_lines:
+                self.status_text.delete("1.0", f"{line_count - self.max_output_lines + 1}.0")
+            self.status_text.see(tk.END)
+        
+        self.root.after(self.output_interval_ms, self.drain_output)
     
     def refresh_cd_list(self):
         """Refresh the CD dropdown list"""
-        cd_items = []
-        for cd_id, cd_info in self.cd_db.cds.items():
-            cd_items.append(f"{cd_info['title']} ({len(cd_info['tracks'])} tracks)")
+        cd_items = self.cd_db.get_cd_labels()
         
         self.cd_combo['values'] = cd_items
         if cd_items:
@@ -143,13 +177,11 @@ class MixCDGUI:
         if not selection:
             return None, None
         
-        # Extract CD index from the dropdown selection
-        cd_index = self.cd_combo.current()
-        if cd_index >= 0:
-            cd_items = list(self.cd_db.cds.items())
-            cd_id, cd_info = cd_items[cd_index]
-            return cd_id, cd_info
-        return None, None
+        # Labels are unique, so this is a dict lookup; only the selected tracklist gets loaded
+        cd_id = self.cd_db.get_cd_id_for_label(selection)
+        if cd_id is None:
+            return None, None
+        return cd_id, self.cd_db.cds[cd_id]
     
     def get_track_selection(self, cd_info):
         """Get the track selection based on user input"""
@@ -183,24 +215,18 @@ class MixCDGUI:
                 messagebox.showerror("Invalid Input", "Please enter comma-separated track numbers")
                 return False
     
-    def get_start_time(self, cd_info, track_selection):
-        """Get the start time based on user selection"""
+    def get_listening_times(self):
+        """Get (start_time, end_time) from the user's selection, one of them None; None if invalid"""
         time_option = self.time_option_var.get()
         
         if time_option == "now":
-            # Calculate backwards from now
-            if isinstance(track_selection, tuple):
-                num_tracks = track_selection[1] - track_selection[0] + 1
-            elif isinstance(track_selection, list):
-                num_tracks = len(track_selection)
-            else:
-                num_tracks = len(cd_info['tracks'])
-            return datetime.now() - timedelta(minutes=num_tracks * 4)
+            # Finished just now: the scrobbler plans backwards once it knows the track lengths
+            return None, datetime.now()
         
         elif time_option == "today":
             try:
                 hour = int(self.hour_spin.get())
-                return datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+                return datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0), None
             except ValueError:
                 messagebox.showerror("Invalid Time", "Please enter a valid hour")
                 return None
@@ -210,7 +236,7 @@ class MixCDGUI:
                 date_str = self.custom_date.get()
                 time_str = self.custom_time.get()
                 datetime_str = f"{date_str} {time_str}"
-                return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M")
+                return datetime.strptime(datetime_str, "%Y-%m-%d %H:%M"), None
             except ValueError:
                 messagebox.showerror("Invalid DateTime", "Please enter valid date (YYYY-MM-DD) and time (HH:MM)")
                 return None
@@ -219,7 +245,7 @@ class MixCDGUI:
         """Test Last.fm authentication"""
         def run_test():
             print("Testing Last.fm authentication...")
-            if self.scrobbler.ensure_authenticated():
+            if self.scrobbler.ensure_authenticated(force=True):
                 print("✓ Authentication successful!")
             else:
                 print("✗ Authentication failed. Please check your credentials.")
@@ -237,22 +263,52 @@ class MixCDGUI:
         if track_selection is False:
             return
         
-        start_time = self.get_start_time(cd_info, track_selection)
-        if start_time is None:
+        times = self.get_listening_times()
+        if times is None:
             return
+        start_time, end_time = times
         
-        def run_scrobble():
+        async def run_scrobble():
             print(f"\nStarting scrobble for: {cd_info['title']}")
             
-            if isinstance(track_selection, tuple):
-                self.scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, track_range=track_selection)
-            elif isinstance(track_selection, list):
-                self.scrobbler.scrobble_mix_cd(track_selection, start_time)
-            else:
-                self.scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time)
+            try:
+                if isinstance(track_selection, tuple):
+                    await self.async_scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time,
+                                                               track_range=track_selection, end_time=end_time)
+                elif isinstance(track_selection, list):
+                    await self.async_scrobbler.scrobble_mix_cd(track_selection, start_time, end_time=end_time)
+                else:
+                    await self.async_scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, end_time=end_time)
+            except Exception as e:
+                # Nothing waits on the engine's future, so report it here or it is lost
+                print(f"✗ Scrobbling failed: {e}")
         
-        # Run scrobbling in a separate thread to prevent GUI freezing
-        threading.Thread(target=run_scrobble, daemon=True).start()
+        # Run scrobbling on the engine's background loop to prevent GUI freezing
+        self.async_scrobbler.submit(run_scrobble())
+    
+    def queue_cd(self):
+        """Add the selected CD to the scrobble queue, to be sent together with the rest of the session"""
+        cd_id, cd_info = self.get_selected_cd_info()
+        if not cd_info:
+            messagebox.showerror("No CD Selected", "Please select a CD to queue")
+            return
+        
+        track_selection = self.get_track_selection(cd_info)
+        if track_selection is False:
+            return
+        
+        times = self.get_listening_times()
+        if times is None:
+            return
+        start_time, end_time = times
+        
+        if isinstance(track_selection, tuple):
+            self.scrobbler.enqueue_cd(cd_info['tracks'], start_time, track_range=track_selection, title=cd_info['title'],
+                                      end_time=end_time)
+        elif isinstance(track_selection, list):
+            self.scrobbler.enqueue_cd(track_selection, start_time, title=cd_info['title'], end_time=end_time)
+        else:
+            self.scrobbler.enqueue_cd(cd_info['tracks'], start_time, title=cd_info['title'], end_time=end_time)
     
     def show_add_cd_window(self):
         """Show the Add CD window"""
@@ -420,6 +476,7 @@ def main():
     root = tk.Tk()
     app = MixCDGUI(root)
     root.mainloop()
+    app.async_scrobbler.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,380 @@
+import csv
+import functools
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+# A CD read from an import source, ready for MixCDDatabase.import_cds
+ImportedCD = namedtuple('ImportedCD', 'cd_id title tracks source line_number')
+
+# Something in the input that could not be imported; the line or CD is skipped
+ImportProblem = namedtuple('ImportProblem', 'source line_number message')
+
+# A track line that does not fit "Artist - Track [Album]"; column is 1-based
+TrackParseError = namedtuple('TrackParseError', 'line_number column message text')
+
+FORMATS = ('text', 'csv', 'm3u', 'cue', 'jsonl')
+
+EXTENSION_FORMATS = {
+    '.txt': 'text',
+    '.csv': 'csv',
+    '.m3u': 'm3u',
+    '.m3u8': 'm3u',
+    '.cue': 'cue',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+# "Artist - Track [Album]": the artist runs up to the first " - ", the album is optional
+# and anything after its closing bracket is ignored
+TRACK_LINE = re.compile(r"(?P<artist>.*?) - (?P<track>[^\[]*)(?:\[(?P<album>[^\]]*)\])?", re.DOTALL)
+
+# Release-type words dropped from album names ("Tim EP" -> "Tim")
+ALBUM_CLEANUP = re.compile(r" single| EP| soundtrack| compilation|single #[123]")
+EMPTY_ALBUMS = frozenset(('', ',', '.', '-', ':'))
+
+CUE_COMMAND = re.compile(r'^\s*([A-Z]+)\s+(?:"(.*)"|(\S.*?))\s*$')
+
+def make_cd_id(title):
+    """Generate a CD id from its title, the same way add_cd_interactive does"""
+    cd_id = title.lower().replace(" ", "_").replace(":", "").replace("-", "_")
+    return ''.join(c for c in cd_id if c.isalnum() or c == '_')
+
+def parse_track(text, line_number=None):
+    """Parse one "Artist - Track [Album]" line
+
+    Returns a track dict, or a TrackParseError saying what is wrong and at
+    which column.
+    """
+    match = TRACK_LINE.match(text)
+    if match is None:
+        return TrackParseError(line_number, len(text.rstrip()) + 1, "expected ' - ' between artist and track", text)
+
+    artist, track, album = match.groups()
+    if album is None and match.end() < len(text):
+        # The track stopped at a '[' that is never closed
+        return TrackParseError(line_number, match.end() + 1, "'[' without a closing ']'", text)
+    artist = artist.strip()
+    if not artist:
+        return TrackParseError(line_number, 1, "missing artist", text)
+    track = track.strip()
+    if not track:
+        return TrackParseError(line_number, match.start('track') + 1, "missing track name", text)
+
+    return {"artist": artist, "track": track, "album": clean_album(album) if album else ""}
+
+@functools.lru_cache(maxsize=4096)
+def clean_album(album):
+    """Drop release-type words and stray punctuation from an album name
+
+    Cached, since the same albums come up again and again in a tracklist.
+    """
+    album = ALBUM_CLEANUP.sub('', album.strip()).strip().rstrip(',').strip()
+    return "" if album in EMPTY_ALBUMS else album
+
+def parse_lines(lines):
+    """Parse a batch of track lines, skipping blank ones
+
+    Returns (tracks, errors): the parsed track dicts in order, and a
+    TrackParseError (with its 1-based line number) for every line that
+    could not be parsed.
+    """
+    tracks = []
+    errors = []
+    for line_number, line in enumerate(lines, 1):
+        if not line or line.isspace():
+            continue
+        result = parse_track(line, line_number)
+        if result.__class__ is dict:
+            tracks.append(result)
+        else:
+            errors.append(result)
+    return tracks, errors
+
+def detect_format(source):
+    """Guess the format of a file from its extension (plain text if unknown)"""
+    if not isinstance(source, str):
+        return 'text'
+    return EXTENSION_FORMATS.get(os.path.splitext(source)[1].lower(), 'text')
+
+def read_lines(source):
+    """Yield (line_number, line) from a path, '-' for stdin, or an open text file
+
+    Lines are read one at a time and have their line ending removed.
+    """
+    if source == '-':
+        f = sys.stdin
+        close = False
+    elif isinstance(source, str):
+        f = open(source, 'r', encoding='utf-8-sig', newline='')
+        close = True
+    else:
+        f = source
+        close = False
+
+    try:
+        for line_number, line in enumerate(f, 1):
+            yield line_number, line.rstrip('\r\n')
+    finally:
+        if close:
+            f.close()
+
+def source_name(source):
+    if source == '-':
+        return '<stdin>'
+    return source if isinstance(source, str) else getattr(source, 'name', '<input>')
+
+def read_text(lines, source):
+    """CD sheets in plain text: a title line, then one "Artist - Track [Album]" per line
+
+    Sheets are separated by blank lines; lines starting with # are comments.
+    """
+    title = None
+    tracks = []
+    start = 0
+    for line_number, line in lines:
+        line = line.strip()
+        if line.startswith('#'):
+            continue
+        if not line:
+            if title is not None:
+                yield None, title, tracks, start
+            title, tracks = None, []
+            continue
+        if title is None:
+            title, start = line, line_number
+            continue
+        track = parse_track(line, line_number)
+        if isinstance(track, TrackParseError):
+            yield ImportProblem(source, line_number, f"column {track.column}: {track.message}: {line}")
+        else:
+            tracks.append(track)
+    if title is not None:
+        yield None, title, tracks, start
+
+def read_csv(lines, source):
+    """CSV with a header row: title (or cd_title), artist, track, and optional cd_id, album and duration
+
+    Consecutive rows of the same CD make up its tracklist.
+    """
+    position = [0]
+
+    def text_lines():
+        for line_number, line in lines:
+            position[0] = line_number
+            yield line
+
+    reader = csv.DictReader(text_lines())
+    current = None
+    for row in reader:
+        line_number = position[0]
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        title = row.get('title') or row.get('cd_title')
+        if not title or not row.get('artist') or not row.get('track'):
+            yield ImportProblem(source, line_number, "row needs title, artist and track")
+            continue
+
+        key = (row.get('cd_id') or None, title)
+        if current is None or current[0] != key:
+            if current is not None:
+                yield current[1]
+            current = (key, (row.get('cd_id') or None, title, [], line_number))
+        current[1][2].append({"artist": row['artist'], "track": row['track'], "album": row.get('album', ''),
+                              "duration": row.get('duration')})
+
+    if current is not None:
+        yield current[1]
+
+def split_artist_title(text):
+    if ' - ' in text:
+        artist, track = text.split(' - ', 1)
+        return artist.strip(), track.strip()
+    return None, text.strip()
+
+def read_m3u(lines, source):
+    """Extended M3U playlist as one CD: #PLAYLIST gives the title, #EXTINF/#EXTALB each entry"""
+    title = None
+    album = ''
+    pending = None
+    tracks = []
+    for line_number, line in lines:
+        line = line.strip()
+        if not line or line == '#EXTM3U':
+            continue
+        if line.startswith('#PLAYLIST:'):
+            title = line[len('#PLAYLIST:'):].strip()
+        elif line.startswith('#EXTALB:'):
+            album = line[len('#EXTALB:'):].strip()
+        elif line.startswith('#EXTINF:'):
+            info = line[len('#EXTINF:'):]
+            seconds, _, text = info.partition(',')
+            pending = (line_number, text, seconds)
+        elif line.startswith('#'):
+            continue
+        else:
+            # A media path ends the entry; fall back to its file name if there was no #EXTINF
+            entry_line, text, seconds = pending or (line_number, os.path.splitext(os.path.basename(line))[0], None)
+            artist, track = split_artist_title(text)
+            if artist and track:
+                tracks.append({"artist": artist, "track": track, "album": album, "duration": seconds})
+            else:
+                yield ImportProblem(source, entry_line, f"no 'Artist - Title' for {line}")
+            pending = None
+            album = ''
+
+    if title is None:
+        title = os.path.splitext(os.path.basename(source))[0] if source != '<stdin>' else 'Imported playlist'
+    yield None, title, tracks, 1
+
+def read_cue(lines, source):
+    """CUE sheet as one CD: the disc TITLE is the CD title, each TRACK's TITLE/PERFORMER a track"""
+    title = None
+    disc_performer = ''
+    tracks = []
+    track = None
+    for line_number, line in lines:
+        match = CUE_COMMAND.match(line)
+        if not match:
+            continue
+        command, value = match.group(1), match.group(2) if match.group(2) is not None else match.group(3)
+        if command == 'TRACK':
+            track = {"artist": '', "track": '', "album": '', "line": line_number}
+            tracks.append(track)
+        elif command == 'TITLE':
+            if track is None:
+                title = value
+            else:
+                track['track'] = value
+        elif command == 'PERFORMER':
+            if track is None:
+                disc_performer = value
+            else:
+                track['artist'] = value
+
+    checked = []
+    for track in tracks:
+        line_number = track.pop('line')
+        track['artist'] = track['artist'] or disc_performer
+        if track['artist'] and track['track']:
+            checked.append(track)
+        else:
+            yield ImportProblem(source, line_number, "TRACK without TITLE or PERFORMER")
+    yield None, title, checked, 1
+
+def read_jsonl(lines, source):
+    """One CD per line: {"id": ..., "title": ..., "tracks": [{"artist", "track", "album", "duration"}, ...]}"""
+    for line_number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ImportProblem(source, line_number, f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict) or not isinstance(record.get('tracks'), list):
+            yield ImportProblem(source, line_number, "expected an object with a tracks list")
+            continue
+        yield record.get('id') or record.get('cd_id'), record.get('title'), record['tracks'], line_number
+
+def parse_duration(value):
+    """Track length in whole seconds from a number or numeric string, None if missing or not positive
+
+    M3U uses -1 for an unknown length, which comes out as None too.
+    """
+    try:
+        seconds = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds > 0 else None
+
+def validate_cd(source, cd_id, title, tracks, line_number):
+    """Turn a parsed CD into an ImportedCD, or an ImportProblem if it cannot be used"""
+    title = (title or '').strip() if isinstance(title, str) else ''
+    if not title:
+        return ImportProblem(source, line_number, "CD has no title")
+    # Library keys are strings; a JSON-lines "id": 5 is stored as "5"
+    if isinstance(cd_id, int) and not isinstance(cd_id, bool):
+        cd_id = str(cd_id)
+    elif cd_id is not None and not isinstance(cd_id, str):
+        return ImportProblem(source, line_number, f"'{title}': id must be a string or a number")
+
+    clean = []
+    for track in tracks:
+        if not isinstance(track, dict):
+            return ImportProblem(source, line_number, f"'{title}': track is not an object")
+        artist = track.get('artist')
+        name = track.get('track')
+        if not isinstance(artist, str) or not isinstance(name, str) or not artist.strip() or not name.strip():
+            return ImportProblem(source, line_number, f"'{title}': every track needs an artist and a track name")
+        clean_track = {"artist": artist.strip(), "track": name.strip(), "album": (track.get('album') or '').strip()}
+        duration = parse_duration(track.get('duration'))
+        if duration:
+            clean_track['duration'] = duration
+        clean.append(clean_track)
+    if not clean:
+        return ImportProblem(source, line_number, f"'{title}' has no tracks")
+
+    return ImportedCD(cd_id or make_cd_id(title), title, clean, source, line_number)
+
+def read_cds(source, format=None):
+    """Stream CDs out of one import source, one at a time
+
+    source is a path, '-' for stdin, or an open text file; format is one of
+    FORMATS and is guessed from the file extension if not given. Yields
+    ImportedCD for every valid CD
+    and ImportProblem for everything skipped, so nothing is held in memory
+    beyond the CD being read.
+    """
+    format = format or detect_format(source)
+    name = source_name(source)
+    lines = read_lines(source)
+
+    if format == 'text':
+        items = read_text(lines, name)
+    elif format == 'csv':
+        items = read_csv(lines, name)
+    elif format == 'm3u':
+        items = read_m3u(lines, name)
+    elif format == 'cue':
+        items = read_cue(lines, name)
+    elif format == 'jsonl':
+        items = read_jsonl(lines, name)
+    else:
+        raise ValueError(f"Unknown import format: {format} (expected one of {', '.join(FORMATS)})")
+
+    for item in items:
+        if isinstance(item, ImportProblem):
+            yield item
+        else:
+            yield validate_cd(name, *item)
+
+def main(argv=None):
+    import argparse
+    from mixcd_scrobbler import MixCDDatabase
+    from mixcd_storage import SQLiteStorage
+    # Use the module's own ImportProblem, not __main__'s, when run with python -m
+    from mixcd_import import read_cds
+
+    parser = argparse.ArgumentParser(description="Bulk import mix CDs from text, CSV, M3U, CUE or JSON-lines files")
+    parser.add_argument('sources', nargs='+', help="files to import, or - for stdin")
+    parser.add_argument('--format', choices=FORMATS, help="input format (default: guess from the file extension)")
+    parser.add_argument('--db', default="mix_cds.json", help="JSON library to import into (default mix_cds.json)")
+    parser.add_argument('--sqlite', metavar='FILE', help="import into a SQLite library instead")
+    parser.add_argument('--batch-size', type=int, default=200, help="CDs saved per transaction (default 200)")
+    args = parser.parse_args(argv)
+
+    storage = SQLiteStorage(args.sqlite) if args.sqlite else None
+    cd_db = MixCDDatabase(args.db, storage=storage)
+
+    def stream():
+        for source in args.sources:
+            yield from read_cds(source, args.format)
+
+    stats = cd_db.import_cds(stream(), batch_size=args.batch_size)
+    cd_db.storage.close()
+    return 1 if stats['problems'] and not stats['cds'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,344 @@
 import hashlib
-import requests
-import webbrowser
 import time
 import json
 import os
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 import random
+import threading
+import itertools
+import heapq
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
-class LastFMScrobbler:
+from scrobble_events import RunStarted, TrackSubmitted, TrackResult, BatchFlushed, RunFinished
+from scrobble_spool import ScrobbleSpool
+from scrobble_history import ScrobbleHistory, DUPLICATE_WINDOW
+from track_durations import DurationCache
+from mixcd_storage import CDCollection, JSONStorage
+from scrobble_metrics import ScrobbleMetrics
+from mixcd_search import SearchIndex
+from mixcd_import import ImportProblem, TrackParseError, parse_track, parse_lines
+
+API_URL = 'http://ws.audioscrobbler.com/2.0/'
+
+# Last.fm accepts at most 50 scrobbles per track.scrobble call
+MAX_SCROBBLES_PER_REQUEST = 50
+
+# Last.fm error code for "Rate limit exceeded"
+RATE_LIMIT_ERROR = 29
+
+# Last.fm errors worth retrying: 11 service offline, 16 temporarily unavailable, 29 rate limit.
+# Anything else (6 bad parameters, 9 invalid session, ...) will fail the same way again.
+RETRYABLE_ERRORS = {11, 16, RATE_LIMIT_ERROR}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Last.fm errors meaning the saved session is no good: 4 authentication failed, 9 invalid session key
+SESSION_ERRORS = {4, 9}
+
+# How long a session verified with user.getInfo is trusted before checking it again
+SESSION_TTL = 24 * 60 * 60
+
+# Last.fm error for track.getInfo on a track it does not know
+TRACK_NOT_FOUND_ERROR = 6
+
+class RateLimiter:
+    """Thread-safe token bucket that every Last.fm API call goes through
+    
+    Allows bursts of up to burst calls, refilling at rate calls per second.
+    When Last.fm says we are going too fast all callers pause, and the pause
+    doubles on each further complaint up to max_backoff seconds.
+    """
+    def __init__(self, rate=5, burst=5, max_backoff=60):
+        self.rate = rate
+        self.burst = burst
+        self.max_backoff = max_backoff
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.backoff = 0
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a call may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed = max(0, now - self.updated)
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+                self.updated = max(now, self.updated)
+                
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+    
+    def slow_down(self):
+        """Pause all callers after a rate limit response"""
+        with self.lock:
+            self.backoff = min(max(self.backoff * 2, 1), self.max_backoff)
+            self.blocked_until = time.monotonic() + self.backoff
+            # Start refilling only once the pause is over
+            self.tokens = 0
+            self.updated = self.blocked_until
+    
+    def recover(self):
+        """Ease the backoff again after a call went through"""
+        with self.lock:
+            self.backoff = self.backoff // 2
+
+class ConsoleReporter:
+    """Progress subscriber that prints scrobble runs to stdout"""
     def __init__(self):
+        self.runs = {}
+    
+    def __call__(self, event):
+        if isinstance(event, RunStarted):
+            self.runs[event.run_id] = event
+            print(f"\n" + "="*50)
+            print("SCROBBLING MIX CD")
+            print("="*50)
+            print(f"Start time: {event.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            if event.track_range:
+                print(f"Tracks: {event.track_range[0]}-{event.track_range[1]} of {event.tracklist_length} (scrobbling {event.track_count} tracks)")
+            else:
+                print(f"Tracks: {event.track_count} (all tracks)")
+            print(f"Estimated duration: {event.track_count * event.avg_track_length} minutes")
+            print()
+            print(f"Submitting {event.track_count} scrobbles in {event.requests} request(s)...")
+            print()
+        
+        elif isinstance(event, TrackResult) and event.run_id in self.runs:
+            run = self.runs[event.run_id]
+            scrobble = event.scrobble
+            if run.track_range:
+                print(f"Track {event.track_number:2d}: {scrobble['artist']} - {scrobble['track']}")
+            else:
+                print(f"Track {event.track_number:2d}/{run.track_count}: {scrobble['artist']} - {scrobble['track']}")
+            
+            if event.outcome == 'failed':
+                print(f"  ✗ Failed to scrobble")
+                return
+            if event.outcome == 'duplicate':
+                print(f"  ⚠ Already scrobbled, skipped")
+                return
+            if event.outcome == 'ignored':
+                print(f"  ⚠ Scrobble ignored (probably duplicate)")
+            print(f"  ✓ Scrobbled at {scrobble['timestamp'].strftime('%H:%M:%S')}")
+        
+        elif isinstance(event, RunFinished) and event.run_id in self.runs:
+            del self.runs[event.run_id]
+            stats = event.stats
+            print(f"\n" + "="*50)
+            print(f"SCROBBLING COMPLETE")
+            print("="*50)
+            print(f"Successfully scrobbled: {stats['accepted'] + stats['ignored']}/{stats['total']} tracks")
+            if stats['queued_for_retry']:
+                print(f"Queued for retry: {stats['queued_for_retry']} tracks (will be sent when back online)")
+            if stats['duplicates']:
+                print(f"Skipped {stats['duplicates']} tracks that were already scrobbled")
+            print(f"Finished at: {stats['end_time'].strftime('%Y-%m-%d %H:%M:%S')}")
+
+class LastFMScrobbler:
+    def __init__(self, connect_timeout=5, read_timeout=15, pool_size=4, spool_file="scrobble_spool.db", rate_limiter=None,
+                 max_retries=3, retry_base_delay=1, retry_max_delay=30, metrics_file=None,
+                 api_url=API_URL, session_ttl=SESSION_TTL, history_file="scrobble_history.db",
+                 durations_file="track_durations.db"):
         self.api_key = None
         self.api_secret = None
         self.session_key = None
         self.credentials_file = "lastfm_credentials.json"
         
+        # Validated-session cache, saved with the credentials
+        self.username = None
+        self.session_verified_at = None
+        self.session_ttl = session_ttl
+        self.credentials_lock = threading.Lock()
+        
+        # HTTP settings for the shared keep-alive session
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.http = None
+        self.http_lock = threading.Lock()
+        
+        # Pass the same RateLimiter to several scrobblers to share one budget
+        self.rate_limiter = rate_limiter or RateLimiter()
+        
+        # Retry policy for transient failures
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        
+        # Progress subscribers; printing to the console is just the default one
+        self.subscribers = []
+        self.run_ids = itertools.count(1)
+        self.console_reporter = ConsoleReporter()
+        self.subscribe(self.console_reporter)
+        
+        # Latency/throughput instrumentation, optionally logged as JSON lines
+        self.metrics = ScrobbleMetrics(metrics_file)
+        self.subscribe(self.metrics)
+        self.retry_counts = self.metrics.retries
+        
+        # Offline spool so scrobbles survive network failures and crashes
+        self.spool = ScrobbleSpool(spool_file) if spool_file else None
+        self.flusher = None
+        self.flusher_stop = threading.Event()
+        
+        # Scrobble queue: CDs waiting (in the spool database) for the single queue worker
+        self.queue_lock = threading.Lock()
+        self.queue_worker = None
+        self.queue_wake = threading.Event()
+        self.queue_now = threading.Event()
+        self.queue_stop = threading.Event()
+        
+        # What has already been scrobbled, so runs can skip duplicates without asking Last.fm
+        self.history = ScrobbleHistory(history_file) if history_file else None
+        
+        # Real track lengths from track.getInfo, used to space out scrobble timestamps
+        self.durations = DurationCache(durations_file) if durations_file else None
+        
         # Load existing credentials if they exist
         self.load_credentials()
     
+    def get_http_session(self):
+        """Get the pooled keep-alive HTTP session, creating it on first use"""
+        if self.http is not None:
+            return self.http
+        
+        # The first calls can arrive together (e.g. the duration lookups), so only one may build it
+        with self.http_lock:
+            if self.http is None:
+                # requests is slow to import, so it is only loaded once we actually go online
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                http = requests.Session()
+                # pool_block makes pool_size a hard limit: extra concurrent calls wait for a free
+                # connection instead of opening throwaway ones
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+                http.mount('http://', adapter)
+                http.mount('https://', adapter)
+                http.headers.update({
+                    'User-Agent': 'MixCDScrobbler',
+                    'Connection': 'keep-alive'
+                })
+                self.http = http
+            return self.http
+    
+    def api_request(self, params, http_method='GET'):
+        """Send an API call to Last.fm, retrying transient failures
+        
+        Network errors, 5xx/429 responses and Last.fm errors 11, 16 and 29 are
+        retried up to max_retries times with capped exponential backoff and
+        full jitter. The number of retries used is stored on the returned
+        response as response.retries and added to retry_counts per method.
+        """
+        import requests
+        
+        method = params.get('method', '')
+        attempt = 0
+        
+        while True:
+            try:
+                response = self.send_request(params, http_method)
+                problem = self.transient_problem(response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response = None
+                problem = e
+            
+            if problem is None or attempt >= self.max_retries:
+                if attempt:
+                    self.metrics.record_retries(method, attempt)
+                if response is None:
+                    raise problem
+                response.retries = attempt
+                return response
+            
+            attempt += 1
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+            print(f"  ⚠ {method} failed ({problem}), retrying in {delay:.1f}s ({attempt}/{self.max_retries})")
+            time.sleep(delay)
+    
+    def send_request(self, params, http_method='GET'):
+        """Send a single API call over the shared session, within the rate limit"""
+        session = self.get_http_session()
+        self.rate_limiter.acquire()
+        
+        method = params.get('method', '')
+        payload_bytes = len(urlencode(params).encode('utf-8'))
+        sent_at = time.perf_counter()
+        try:
+            if http_method == 'POST':
+                response = session.post(self.api_url, data=params, timeout=self.timeout)
+            else:
+                response = session.get(self.api_url, params=params, timeout=self.timeout)
+        except Exception:
+            self.metrics.record_request(method, time.perf_counter() - sent_at, payload_bytes, ok=False)
+            raise
+        self.metrics.record_request(method, time.perf_counter() - sent_at, payload_bytes,
+                                    ok=response.status_code == 200)
+        
+        if self.is_rate_limited(response):
+            print("  ⚠ Last.fm rate limit hit, slowing down")
+            self.rate_limiter.slow_down()
+        else:
+            self.rate_limiter.recover()
+        
+        if self.api_error_code(response) in SESSION_ERRORS:
+            self.invalidate_session()
+        return response
+    
+    def api_error_code(self, response):
+        """Get the Last.fm error code from a response, or None if there isn't one"""
+        # Only parse the body when it could be an error payload
+        if response.status_code == 200 and '"error"' not in response.text:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        if isinstance(data, dict) and 'error' in data:
+            try:
+                return int(data['error'])
+            except (TypeError, ValueError):
+                return None
+        return None
+    
+    def is_rate_limited(self, response):
+        """Check whether Last.fm rejected a call for going too fast"""
+        if response.status_code in (429, 503):
+            return True
+        return self.api_error_code(response) == RATE_LIMIT_ERROR
+    
+    def transient_problem(self, response):
+        """Describe why a response is worth retrying, or None if it isn't"""
+        error_code = self.api_error_code(response)
+        if error_code is not None:
+            return f"Last.fm error {error_code}" if error_code in RETRYABLE_ERRORS else None
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            return f"HTTP {response.status_code}"
+        return None
+    
+    def close(self):
+        """Stop the background threads and close pooled connections (safe to call more than once)"""
+        self.stop_queue_worker()
+        self.stop_spool_flusher()
+        with self.http_lock:
+            if self.http is not None:
+                self.metrics.write_line('close')
+                self.http.close()
+                self.http = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def load_credentials(self):
         """Load saved credentials from file"""
         try:
@@ -27,6 +348,8 @@ class LastFMScrobbler:
                     self.api_key = creds.get('api_key')
                     self.api_secret = creds.get('api_secret')
                     self.session_key = creds.get('session_key')
+                    self.username = creds.get('username')
+                    self.session_verified_at = creds.get('session_verified_at')
                     print("✓ Loaded saved credentials")
                     return True
         except Exception as e:
@@ -39,7 +362,9 @@ class LastFMScrobbler:
             creds = {
                 'api_key': self.api_key,
                 'api_secret': self.api_secret,
-                'session_key': self.session_key
+                'session_key': self.session_key,
+                'username': self.username,
+                'session_verified_at': self.session_verified_at
             }
             with open(self.credentials_file, 'w') as f:
                 json.dump(creds, f, indent=2)
@@ -104,7 +429,7 @@ class LastFMScrobbler:
         token_params['api_sig'] = self.generate_api_signature(token_params)
         
         try:
-            response = requests.get('http://ws.audioscrobbler.com/2.0/', params=token_params)
+            response = self.api_request(token_params)
             if response.status_code != 200:
                 print(f"✗ Failed to get token: {response.text}")
                 return False
@@ -128,6 +453,7 @@ class LastFMScrobbler:
         print("\nOpening in your browser...")
         
         try:
+            import webbrowser
             webbrowser.open(auth_url)
         except:
             print("Could not open browser. Please copy the URL above.")
@@ -149,13 +475,14 @@ class LastFMScrobbler:
         session_params['api_sig'] = self.generate_api_signature(session_params)
         
         try:
-            response = requests.get('http://ws.audioscrobbler.com/2.0/', params=session_params)
+            response = self.api_request(session_params)
             
             if response.status_code == 200:
                 data = response.json()
                 if 'session' in data:
                     self.session_key = data['session']['key']
                     username = data['session']['name']
+                    self.mark_session_verified(username)
                     print(f"✓ Success! Authenticated as: {username}")
                     return True
                 else:
@@ -170,6 +497,14 @@ class LastFMScrobbler:
     
     def test_authentication(self):
         """Test if authentication is working"""
+        return self.verify_session() == 'ok'
+    
+    def verify_session(self):
+        """Check the session with user.getInfo
+        
+        Returns 'ok', 'offline' if Last.fm could not be reached or had a
+        transient problem, or 'rejected' if it refused the credentials.
+        """
         print("\n5. Testing authentication...")
         
         params = {
@@ -182,22 +517,32 @@ class LastFMScrobbler:
         params['api_sig'] = self.generate_api_signature(params)
         
         try:
-            response = requests.get('http://ws.audioscrobbler.com/2.0/', params=params)
+            response = self.api_request(params)
             
             if response.status_code == 200:
                 data = response.json()
                 if 'user' in data:
+                    self.mark_session_verified(data['user']['name'])
+                    self.save_credentials()
                     print(f"✓ Ready to scrobble as: {data['user']['name']}")
-                    return True
+                    return 'ok'
             
             print(f"✗ Authentication test failed: {response.text}")
+            return 'offline' if self.transient_problem(response) else 'rejected'
         except Exception as e:
             print(f"✗ Test failed: {e}")
-        
-        return False
+            return 'offline'
     
-    def ensure_authenticated(self):
-        """Make sure we have valid authentication"""
+    def ensure_authenticated(self, allow_offline=False, force=False):
+        """Make sure we have valid authentication
+        
+        A session verified within session_ttl is trusted without asking
+        Last.fm again, unless force is set (an explicit "Test
+        authentication"). With allow_offline, saved credentials that could not be checked
+        because Last.fm is unreachable are good enough: the caller spools
+        its scrobbles and the flusher sends them later. Missing credentials
+        or a session Last.fm rejected still fail.
+        """
         # Check if we have all credentials
         if not all([self.api_key, self.api_secret, self.session_key]):
             print("Missing credentials. Setting up authentication...")
@@ -214,121 +559,650 @@ class LastFMScrobbler:
             # Save credentials
             self.save_credentials()
         
+        # Skip the user.getInfo round trip while the last check is recent enough
+        if not force and self.session_is_fresh():
+            print(f"✓ Ready to scrobble as: {self.username}")
+            return True
+        
         # Test authentication
-        return self.test_authentication()
+        status = self.verify_session()
+        if status == 'offline' and allow_offline:
+            print("⚠ Could not reach Last.fm, scrobbles will be queued and sent once it is back")
+            return True
+        return status == 'ok'
+    
+    def mark_session_verified(self, username):
+        """Remember that Last.fm just accepted the session key"""
+        self.username = username
+        self.session_verified_at = time.time()
+    
+    def session_is_fresh(self):
+        """Check whether the session was verified within session_ttl seconds"""
+        if not self.username or self.session_verified_at is None:
+            return False
+        age = time.time() - self.session_verified_at
+        return 0 <= age < self.session_ttl
+    
+    def invalidate_session(self):
+        """Forget the verified session after Last.fm rejected it (errors 4 and 9)
+        
+        The session key itself is kept; the next run checks it again with
+        user.getInfo instead of trusting the cache.
+        """
+        with self.credentials_lock:
+            if self.session_verified_at is None:
+                return
+            self.username = None
+            self.session_verified_at = None
+            print("⚠ Last.fm rejected the saved session")
+            self.save_credentials()
+    
+    def subscribe(self, callback):
+        """Register callback(event) for progress events (called from worker threads)"""
+        self.subscribers.append(callback)
+    
+    def unsubscribe(self, callback):
+        """Stop sending progress events to callback"""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+    
+    def emit(self, event):
+        """Send a progress event to every subscriber"""
+        for callback in list(self.subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"✗ Progress subscriber failed: {e}")
     
     def scrobble_track(self, artist, track, album, timestamp):
         """Scrobble a single track to Last.fm"""
+        outcome = self.scrobble_batch([{
+            'artist': artist,
+            'track': track,
+            'album': album,
+            'timestamp': timestamp
+        }])[0]
+        
+        if outcome == 'ignored':
+            print(f"  ⚠ Scrobble ignored (probably duplicate)")
+        return outcome != 'failed'  # Ignored still counts as success
+    
+    def scrobble_batch(self, scrobbles, run_id=None):
+        """Scrobble many tracks using as few requests as possible
+        
+        Each item is a dict with artist, track, album and timestamp keys.
+        Returns one outcome per item: 'accepted', 'ignored' or 'failed'.
+        """
+        outcomes = []
+        for start in range(0, len(scrobbles), MAX_SCROBBLES_PER_REQUEST):
+            chunk = scrobbles[start:start + MAX_SCROBBLES_PER_REQUEST]
+            outcomes.extend(self.submit_and_report(chunk, run_id))
+        return outcomes
+    
+    def submit_and_report(self, chunk, run_id=None):
+        """Submit one batch and emit its TrackSubmitted, BatchFlushed and TrackResult events"""
+        for scrobble in chunk:
+            self.emit(TrackSubmitted(run_id, scrobble.get('track_number'), scrobble))
+        
+        outcomes = self.submit_scrobble_chunk(chunk)
+        if self.history is not None:
+            self.history.record([scrobble for scrobble, outcome in zip(chunk, outcomes) if outcome != 'failed'])
+        
+        self.emit(BatchFlushed(run_id, len(chunk), outcomes.count('accepted'),
+                               outcomes.count('ignored'), outcomes.count('failed')))
+        for scrobble, outcome in zip(chunk, outcomes):
+            self.emit(TrackResult(run_id, scrobble.get('track_number'), scrobble, outcome))
+        return outcomes
+    
+    def submit_scrobble_chunk(self, chunk):
+        """Send up to 50 scrobbles in a single signed track.scrobble call"""
         params = {
             'method': 'track.scrobble',
             'api_key': self.api_key,
             'sk': self.session_key,
-            'artist': artist,
-            'track': track,
-            'timestamp': int(timestamp.timestamp()),
             'format': 'json'
         }
         
-        # Add album if provided
-        if album:
-            params['album'] = album
+        # Last.fm takes batches as indexed array parameters: artist[0], track[0], ...
+        for i, item in enumerate(chunk):
+            params[f'artist[{i}]'] = item['artist']
+            params[f'track[{i}]'] = item['track']
+            params[f'timestamp[{i}]'] = int(item['timestamp'].timestamp())
+            if item.get('album'):
+                params[f'album[{i}]'] = item['album']
         
         # Generate signature
         params['api_sig'] = self.generate_api_signature(params)
         
         try:
-            response = requests.post('http://ws.audioscrobbler.com/2.0/', data=params)
+            response = self.api_request(params, http_method='POST')
             
             if response.status_code == 200:
                 data = response.json()
                 if 'scrobbles' in data:
-                    # Check if scrobble was accepted
-                    attr = data['scrobbles'].get('@attr', {})
-                    accepted = int(attr.get('accepted', 0))
-                    ignored = int(attr.get('ignored', 0))
-                    
-                    if accepted > 0:
-                        return True
-                    elif ignored > 0:
-                        print(f"  ⚠ Scrobble ignored (probably duplicate)")
-                        return True  # Still count as success
-                    else:
-                        print(f"  ✗ Scrobble not accepted: {data}")
-                        return False
-                else:
-                    print(f"  ✗ Unexpected response format: {data}")
-                    return False
+                    return self.parse_scrobble_results(data['scrobbles'], len(chunk))
+                print(f"  ✗ Unexpected response format: {data}")
             else:
                 print(f"  ✗ HTTP Error {response.status_code}: {response.text}")
         except Exception as e:
             print(f"  ✗ Error: {e}")
         
-        return False
+        return ['failed'] * len(chunk)
     
-    def scrobble_mix_cd(self, tracklist, start_time=None, avg_track_length=4, track_range=None):
-        """Scrobble an entire mix CD or selected tracks"""
-        if not self.ensure_authenticated():
-            print("✗ Authentication failed. Cannot scrobble.")
+    def parse_scrobble_results(self, scrobbles_data, count):
+        """Turn a track.scrobble response into one outcome per submitted track"""
+        # A single scrobble comes back as a dict, several as a list
+        items = scrobbles_data.get('scrobble', [])
+        if isinstance(items, dict):
+            items = [items]
+        
+        if len(items) == count:
+            outcomes = []
+            for item in items:
+                ignored = item.get('ignoredMessage', {})
+                if str(ignored.get('code', '0')) == '0':
+                    outcomes.append('accepted')
+                else:
+                    outcomes.append('ignored')
+            return outcomes
+        
+        # No usable per-item results, fall back to the summary counters
+        attr = scrobbles_data.get('@attr', {})
+        accepted = int(attr.get('accepted', 0))
+        ignored = int(attr.get('ignored', 0))
+        
+        if accepted == count:
+            return ['accepted'] * count
+        elif ignored == count:
+            return ['ignored'] * count
+        
+        print(f"  ✗ Scrobble not accepted: {scrobbles_data}")
+        return ['failed'] * count
+    
+    def flush_spool(self):
+        """Submit everything waiting in the offline spool, one batch at a time
+        
+        Stops at the first batch that fails, since that usually means we are
+        still offline. Returns the number of scrobbles acknowledged.
+        """
+        if self.spool is None or not all([self.api_key, self.api_secret, self.session_key]):
+            return 0
+        
+        flushed = 0
+        while True:
+            batch = self.spool.claim(MAX_SCROBBLES_PER_REQUEST)
+            if not batch:
+                break
+            
+            outcomes = self.submit_and_report([scrobble for _, scrobble in batch])
+            acknowledged = [spool_id for (spool_id, _), outcome in zip(batch, outcomes) if outcome != 'failed']
+            failed = [spool_id for (spool_id, _), outcome in zip(batch, outcomes) if outcome == 'failed']
+            
+            self.spool.remove(acknowledged)
+            self.spool.release(failed)
+            flushed += len(acknowledged)
+            
+            if failed:
+                break
+        
+        return flushed
+    
+    def start_spool_flusher(self, interval=60, max_interval=900):
+        """Start a background thread that drains the offline spool
+        
+        The first pass runs immediately, which replays anything left over from
+        a previous run. While flushes keep failing the wait between attempts
+        doubles up to max_interval.
+        """
+        if self.spool is None or self.flusher is not None:
             return
         
-        if start_time is None:
-            start_time = datetime.now()
+        self.flusher_stop.clear()
+        
+        def run_flusher():
+            wait = interval
+            while not self.flusher_stop.is_set():
+                if self.spool.count():
+                    try:
+                        flushed = self.flush_spool()
+                        if flushed:
+                            print(f"✓ Sent {flushed} queued scrobbles")
+                    except Exception as e:
+                        print(f"✗ Could not flush queued scrobbles: {e}")
+                    
+                    if self.spool.count():
+                        wait = min(wait * 2, max_interval)
+                    else:
+                        wait = interval
+                
+                self.flusher_stop.wait(wait)
+        
+        self.flusher = threading.Thread(target=run_flusher, daemon=True)
+        self.flusher.start()
+    
+    def stop_spool_flusher(self):
+        """Stop the background spool flusher if it is running"""
+        if self.flusher is None:
+            return
+        self.flusher_stop.set()
+        self.flusher.join(timeout=5)
+        self.flusher = None
+    
+    def fetch_track_duration(self, artist, track):
+        """Look up a track's duration in seconds with track.getInfo
+        
+        Returns None if Last.fm does not know the track or its length, and
+        raises if the lookup itself failed so that nothing gets cached. This
+        is a single attempt with no retries: durations are only a nicety and
+        must not hold up a scrobble when we are offline.
+        """
+        params = {
+            'method': 'track.getInfo',
+            'api_key': self.api_key,
+            'artist': artist,
+            'track': track,
+            'autocorrect': '1',
+            'format': 'json'
+        }
+        response = self.send_request(params)
+        error_code = self.api_error_code(response)
+        if error_code == TRACK_NOT_FOUND_ERROR:
+            return None
+        if error_code is not None or response.status_code != 200:
+            raise RuntimeError(f"track.getInfo failed: HTTP {response.status_code}, error {error_code}")
         
-        # Handle track selection
+        duration_ms = int(response.json().get('track', {}).get('duration') or 0)
+        return duration_ms // 1000 or None
+    
+    def fetch_durations(self, wanted):
+        """Look up many durations at once and cache them
+        
+        wanted maps cache keys to (artist, track). Lookups run pool_size at
+        a time within the rate limit; after the first network failure the
+        rest are skipped. Returns key -> duration for the lookups that
+        worked.
+        """
+        offline = threading.Event()
+        
+        def fetch(artist, track):
+            if offline.is_set():
+                return False, None
+            try:
+                return True, self.fetch_track_duration(artist, track)
+            except Exception:
+                offline.set()
+                return False, None
+        
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            results = list(zip(wanted, pool.map(lambda names: fetch(*names), wanted.values())))
+        
+        fetched = {key: duration for key, (ok, duration) in results if ok}
+        if len(fetched) < len(wanted):
+            print(f"  ⚠ Could not look up {len(wanted) - len(fetched)} track lengths, estimating them instead")
+        if fetched:
+            self.durations.store(fetched)
+        return fetched
+    
+    def lookup_durations(self, tracks, fetch=True):
+        """Durations in seconds for a list of tracks, None where unknown
+        
+        A duration stored with the track wins. Otherwise the duration cache
+        is used, and with fetch set, tracks it has not seen are looked up
+        with track.getInfo and cached, so scrobbling the same CD again makes
+        no metadata calls at all.
+        """
+        durations = [track_info.get('duration') for track_info in tracks]
+        if self.durations is None:
+            return durations
+        
+        keys = {}
+        names = {}
+        for i, track_info in enumerate(tracks):
+            if durations[i] is None:
+                key = self.durations.key(track_info['artist'], track_info['track'])
+                keys[i] = key
+                names.setdefault(key, (track_info['artist'], track_info['track']))
+        
+        known = self.durations.lookup(names)
+        wanted = {key: artist_track for key, artist_track in names.items() if key not in known}
+        if fetch and wanted and self.api_key:
+            known.update(self.fetch_durations(wanted))
+        
+        for i, key in keys.items():
+            durations[i] = known.get(key)
+        return durations
+    
+    def listening_time(self, tracks, avg_track_length=4):
+        """How long the tracks take to play, from known durations or avg_track_length minutes each
+        
+        Only uses durations that are already known, so it is safe to call
+        from the UI thread.
+        """
+        durations = self.lookup_durations(tracks, fetch=False)
+        return timedelta(seconds=sum(duration or avg_track_length * 60 for duration in durations))
+    
+    def selected_tracks(self, tracklist, track_range=None):
+        """Tracks a run covers and the track number offset of the first one"""
         if track_range:
             start_track, end_track = track_range
-            selected_tracks = tracklist[start_track-1:end_track]  # Convert to 0-based indexing
-            track_offset = start_track - 1
-        else:
-            selected_tracks = tracklist
-            track_offset = 0
+            return tracklist[start_track-1:end_track], start_track - 1  # Convert to 0-based indexing
+        return tracklist, 0
+    
+    def plan_scrobbles(self, tracklist, start_time, avg_track_length=4, track_range=None, durations=None,
+                       end_time=None):
+        """Work out which tracks to scrobble and when
         
-        print(f"\n" + "="*50)
-        print("SCROBBLING MIX CD")
-        print("="*50)
-        print(f"Start time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        if track_range:
-            print(f"Tracks: {track_range[0]}-{track_range[1]} of {len(tracklist)} (scrobbling {len(selected_tracks)} tracks)")
-        else:
-            print(f"Tracks: {len(selected_tracks)} (all tracks)")
-        print(f"Estimated duration: {len(selected_tracks) * avg_track_length} minutes")
-        print()
+        durations (from lookup_durations, one per selected track) gives
+        real track lengths in seconds; tracks without one are assumed to
+        last avg_track_length minutes, give or take 25%. With end_time
+        instead of start_time the tracks are planned backwards, so the last
+        one finishes at end_time ("just now" without guessing the length).
+        Returns (scrobbles, track_offset, end_time).
+        """
+        selected_tracks, track_offset = self.selected_tracks(tracklist, track_range)
+        durations = durations or [None] * len(selected_tracks)
         
-        current_time = start_time
-        successful_scrobbles = 0
+        current_time = start_time or end_time
+        scrobbles = []
         
-        for i, track_info in enumerate(selected_tracks, 1):
-            actual_track_num = i + track_offset
-            artist = track_info['artist']
-            track = track_info['track']
-            album = track_info.get('album', '')
+        for i, (track_info, duration) in enumerate(zip(selected_tracks, durations), 1):
+            scrobbles.append({
+                'artist': track_info['artist'],
+                'track': track_info['track'],
+                'album': track_info.get('album', ''),
+                'timestamp': current_time,
+                'track_number': i + track_offset
+            })
             
-            if track_range:
-                print(f"Track {actual_track_num:2d}: {artist} - {track}")
+            if duration:
+                current_time += timedelta(seconds=duration)
             else:
-                print(f"Track {i:2d}/{len(selected_tracks)}: {artist} - {track}")
+                # No known length: assume a realistic duration with some variation
+                track_duration = random.uniform(avg_track_length * 0.75, avg_track_length * 1.25)
+                current_time += timedelta(minutes=track_duration)
+        
+        if start_time is None and end_time is not None:
+            shift = end_time - current_time
+            for scrobble in scrobbles:
+                scrobble['timestamp'] += shift
+            current_time = end_time
+        
+        return scrobbles, track_offset, current_time
+    
+    def skip_duplicates(self, scrobbles, allow_duplicates=False):
+        """Split planned scrobbles into (to_send, duplicates)
+        
+        A duplicate is in the scrobble history, or still waiting in the
+        offline spool from an earlier run that could not be sent yet.
+        """
+        if allow_duplicates or not scrobbles or (self.history is None and self.spool is None):
+            return scrobbles, []
+        flags = [False] * len(scrobbles)
+        if self.history is not None:
+            flags = self.history.find_duplicates(scrobbles)
+        if self.spool is not None:
+            window = self.history.window if self.history is not None else DUPLICATE_WINDOW
+            flags = [duplicate or pending for duplicate, pending in zip(flags, self.spool.find_pending(scrobbles, window))]
+        return ([scrobble for scrobble, duplicate in zip(scrobbles, flags) if not duplicate],
+                [scrobble for scrobble, duplicate in zip(scrobbles, flags) if duplicate])
+    
+    def report_duplicates(self, run_id, duplicates):
+        """Emit a 'duplicate' TrackResult for every skipped scrobble"""
+        for scrobble in duplicates:
+            self.emit(TrackResult(run_id, scrobble.get('track_number'), scrobble, 'duplicate'))
+    
+    def spool_scrobbles(self, scrobbles):
+        """Write scrobbles about to be submitted to the offline spool"""
+        if self.spool is None:
+            return []
+        return self.spool.add(scrobbles, in_flight=True)
+    
+    def acknowledge_spooled(self, spool_ids, outcomes):
+        """Drop acknowledged scrobbles from the spool and release the failed ones"""
+        if self.spool is None:
+            return
+        self.spool.remove([spool_id for spool_id, outcome in zip(spool_ids, outcomes) if outcome != 'failed'])
+        self.spool.release([spool_id for spool_id, outcome in zip(spool_ids, outcomes) if outcome == 'failed'])
+    
+    def start_run(self, tracklist, scrobbles, start_time, avg_track_length=4, track_range=None):
+        """Emit RunStarted for a new scrobble run and return its run id"""
+        run_id = next(self.run_ids)
+        requests_needed = -(-len(scrobbles) // MAX_SCROBBLES_PER_REQUEST)
+        self.emit(RunStarted(run_id, len(scrobbles), len(tracklist), track_range,
+                             start_time, avg_track_length, requests_needed))
+        return run_id
+    
+    def finish_run(self, run_id, scrobbles, outcomes, end_time, began, duplicates=()):
+        """Emit RunFinished with the run's stats and return them"""
+        failed = outcomes.count('failed')
+        stats = {
+            'total': len(scrobbles),
+            'accepted': outcomes.count('accepted'),
+            'ignored': outcomes.count('ignored'),
+            'failed': failed,
+            'queued_for_retry': failed if self.spool else 0,
+            'duplicates': len(duplicates),
+            'requests': -(-len(scrobbles) // MAX_SCROBBLES_PER_REQUEST),
+            'end_time': end_time,
+            'elapsed_seconds': time.monotonic() - began
+        }
+        self.emit(RunFinished(run_id, stats))
+        return stats
+    
+    def scrobble_mix_cd(self, tracklist, start_time=None, avg_track_length=4, track_range=None,
+                        allow_duplicates=False, end_time=None):
+        """Scrobble an entire mix CD or selected tracks
+        
+        Timestamps are spaced by real track lengths where Last.fm knows them
+        (see lookup_durations), starting at start_time or, if only end_time
+        is given, finishing at end_time. Tracks the scrobble history shows were
+        already scrobbled at about the same time are skipped unless
+        allow_duplicates is set. Progress is reported through events (see
+        subscribe); returns the run's stats, or None if authentication failed.
+        """
+        # Offline with saved credentials still plans and spools the run for the flusher
+        if not self.ensure_authenticated(allow_offline=True):
+            print("✗ Authentication failed. Cannot scrobble.")
+            return None
+        
+        if start_time is None and end_time is None:
+            start_time = datetime.now()
+        began = time.monotonic()
+        
+        # Work out every timestamp up front so the whole CD can go out in batches
+        durations = self.lookup_durations(self.selected_tracks(tracklist, track_range)[0])
+        scrobbles, track_offset, end_time = self.plan_scrobbles(tracklist, start_time, avg_track_length, track_range,
+                                                                durations, end_time)
+        if start_time is None:
+            start_time = scrobbles[0]['timestamp'] if scrobbles else end_time
+        scrobbles, duplicates = self.skip_duplicates(scrobbles, allow_duplicates)
+        run_id = self.start_run(tracklist, scrobbles, start_time, avg_track_length, track_range)
+        self.report_duplicates(run_id, duplicates)
+        
+        # Write everything to the spool first so nothing is lost if we go offline or crash
+        spool_ids = self.spool_scrobbles(scrobbles)
+        outcomes = self.scrobble_batch(scrobbles, run_id)
+        self.acknowledge_spooled(spool_ids, outcomes)
+        
+        return self.finish_run(run_id, scrobbles, outcomes, end_time, began, duplicates)
+    
+    def enqueue_cd(self, tracklist, start_time=None, track_range=None, avg_track_length=4, title=None,
+                   allow_duplicates=False, allow_overlap=False, end_time=None):
+        """Add a CD, or a range of its tracks, to the scrobble queue
+        
+        The queue is kept in the spool database, so it survives restarts,
+        and everything in it is sent together by process_queue. Give either
+        start_time or end_time (default: finished just now); a CD queued by
+        end_time is planned backwards from it once its real track lengths
+        are known. A CD whose estimated listening time overlaps one already
+        queued is refused unless allow_overlap is set. Returns the job id,
+        or None if the CD was not queued.
+        """
+        if self.spool is None:
+            print("✗ The scrobble queue needs the offline spool")
+            return None
+        
+        title = title or "Mix CD"
+        tracks = self.selected_tracks(tracklist, track_range)[0]
+        if not tracks:
+            print(f"✗ No tracks selected from '{title}'")
+            return None
+        if start_time is None and end_time is None:
+            end_time = datetime.now()
+        
+        # Only an estimate for the overlap check; process_queue plans with real durations
+        ends_at_end_time = start_time is None
+        if ends_at_end_time:
+            start_time = end_time - self.listening_time(tracks, avg_track_length)
+        else:
+            end_time = start_time + self.listening_time(tracks, avg_track_length)
+        
+        overlaps = self.spool.overlapping_jobs(start_time, end_time)
+        if overlaps and not allow_overlap:
+            for job in overlaps:
+                print(f"✗ '{title}' overlaps '{job.title}' "
+                      f"({job.start_time.strftime('%Y-%m-%d %H:%M')}-{job.end_time.strftime('%H:%M')}), not queued")
+            return None
+        
+        job_id = self.spool.add_job(title, tracks, start_time, end_time, avg_track_length, allow_duplicates,
+                                    ends_at_end_time)
+        print(f"✓ Queued '{title}' ({start_time.strftime('%Y-%m-%d %H:%M')}-{end_time.strftime('%H:%M')}), "
+              f"{self.spool.job_count()} CD(s) waiting")
+        self.queue_wake.set()
+        return job_id
+    
+    def report_overlaps(self, planned):
+        """Warn about queued CDs whose planned times overlap; planned is (job, scrobbles, end_time) by start time"""
+        latest = None
+        for job, scrobbles, end_time in planned:
+            if latest is not None and job.start_time < latest[1]:
+                print(f"  ⚠ '{job.title}' starts at {job.start_time.strftime('%H:%M')}, "
+                      f"before '{latest[0].title}' ends at {latest[1].strftime('%H:%M')}")
+            if latest is None or end_time > latest[1]:
+                latest = (job, end_time)
+    
+    def process_queue(self):
+        """Scrobble every queued CD as one time-ordered run
+        
+        Each job is planned with real track durations, then all of them are
+        merged by timestamp into a single stream that goes out in full
+        batches of MAX_SCROBBLES_PER_REQUEST, however the tracks were split
+        between CDs. The jobs leave the queue as their scrobbles enter the
+        offline spool, so anything that fails is retried from there.
+        Returns the run's stats, or None if the queue was empty or
+        authentication failed.
+        """
+        if self.spool is None:
+            return None
+        
+        # Only one pipeline at a time may turn jobs into scrobbles
+        with self.queue_lock:
+            jobs = self.spool.jobs()
+            if not jobs:
+                return None
+            if not self.ensure_authenticated():
+                print("✗ Authentication failed. Queued CDs will be sent later.")
+                return None
+            began = time.monotonic()
             
-            # Scrobble the track
-            success = self.scrobble_track(artist, track, album, current_time)
+            planned = []
+            duplicates = []
+            for job in jobs:
+                durations = self.lookup_durations(job.tracks)
+                if job.ends_at_end_time:
+                    scrobbles, _, end_time = self.plan_scrobbles(job.tracks, None, job.avg_track_length,
+                                                                 durations=durations, end_time=job.end_time)
+                    job = job._replace(start_time=scrobbles[0]['timestamp'] if scrobbles else job.end_time)
+                else:
+                    scrobbles, _, end_time = self.plan_scrobbles(job.tracks, job.start_time, job.avg_track_length,
+                                                                 durations=durations)
+                scrobbles, skipped = self.skip_duplicates(scrobbles, job.allow_duplicates)
+                planned.append((job, scrobbles, end_time))
+                duplicates.extend(skipped)
+            planned.sort(key=lambda plan: plan[0].start_time)
+            self.report_overlaps(planned)
             
-            if success:
-                print(f"  ✓ Scrobbled at {current_time.strftime('%H:%M:%S')}")
-                successful_scrobbles += 1
-            else:
-                print(f"  ✗ Failed to scrobble")
+            # One time-ordered stream across all the CDs, numbered in listening order
+            by_time = itemgetter('timestamp')
+            scrobbles = list(heapq.merge(*(job_scrobbles for _, job_scrobbles, _ in planned), key=by_time))
+            duplicates.sort(key=by_time)
+            for number, scrobble in enumerate(heapq.merge(scrobbles, duplicates, key=by_time), 1):
+                scrobble['track_number'] = number
+            
+            print(f"\nSending {len(jobs)} queued CD(s): {', '.join(job.title for job in jobs)}")
+            tracklist = [track for job in jobs for track in job.tracks]
+            run_id = self.start_run(tracklist, scrobbles, planned[0][0].start_time, jobs[0].avg_track_length)
+            self.report_duplicates(run_id, duplicates)
             
-            # Add realistic track duration with some variation
-            track_duration = random.uniform(avg_track_length * 0.75, avg_track_length * 1.25)
-            current_time += timedelta(minutes=track_duration)
+            spool_ids = self.spool.add(scrobbles, in_flight=True, job_ids=[job.job_id for job in jobs])
+            outcomes = self.scrobble_batch(scrobbles, run_id)
+            self.acknowledge_spooled(spool_ids, outcomes)
             
-            # Small delay to be nice to Last.fm's servers
-            time.sleep(0.5)
+            end_time = max(end_time for _, _, end_time in planned)
+            return self.finish_run(run_id, scrobbles, outcomes, end_time, began, duplicates)
+    
+    def start_queue_worker(self, linger=60, retry_interval=60, max_interval=900):
+        """Start the background thread that sends the scrobble queue
         
-        print(f"\n" + "="*50)
-        print(f"SCROBBLING COMPLETE")
-        print("="*50)
-        print(f"Successfully scrobbled: {successful_scrobbles}/{len(selected_tracks)} tracks")
-        print(f"Finished at: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        Once something is queued the worker waits until nothing new has
+        been added for linger seconds (or flush_queue is called), so a
+        listening session queued CD by CD still goes out as one run. Jobs
+        left over from a previous run are picked up straight away. While
+        sending keeps failing the wait between attempts doubles up to
+        max_interval.
+        """
+        if self.spool is None or self.queue_worker is not None:
+            return
+        
+        self.queue_stop.clear()
+        
+        def run_worker():
+            wait = retry_interval
+            while not self.queue_stop.is_set():
+                if not self.spool.job_count():
+                    # A flush asked for while the queue was empty must not rush the next CD out alone
+                    self.queue_now.clear()
+                    self.queue_wake.wait()
+                    self.queue_wake.clear()
+                    continue
+                
+                while not self.queue_now.is_set() and not self.queue_stop.is_set() and self.queue_wake.wait(linger):
+                    self.queue_wake.clear()
+                if self.queue_stop.is_set():
+                    break
+                self.queue_now.clear()
+                
+                try:
+                    self.process_queue()
+                except Exception as e:
+                    print(f"✗ Could not send queued CDs: {e}")
+                
+                if self.spool.job_count():
+                    # Probably offline; try again later, or as soon as flush_queue is called
+                    self.queue_wake.wait(wait)
+                    self.queue_wake.clear()
+                    wait = min(wait * 2, max_interval)
+                else:
+                    wait = retry_interval
+        
+        self.queue_worker = threading.Thread(target=run_worker, daemon=True)
+        self.queue_worker.start()
+    
+    def flush_queue(self):
+        """Ask the queue worker to send the queue now instead of waiting for more CDs"""
+        if self.spool is None or not self.spool.job_count():
+            return
+        self.queue_now.set()
+        self.queue_wake.set()
+    
+    def stop_queue_worker(self):
+        """Stop the queue worker if it is running; queued CDs stay on disk"""
+        if self.queue_worker is None:
+            return
+        self.queue_stop.set()
+        self.queue_wake.set()
+        self.queue_worker.join(timeout=5)
+        self.queue_worker = None
     
     def select_tracks(self, tracklist):
         """Interactive track selection"""
@@ -385,20 +1259,34 @@ class LastFMScrobbler:
             return None
 
 class MixCDDatabase:
-    def __init__(self):
-        self.db_file = "mix_cds.json"
+    def __init__(self, db_file="mix_cds.json", storage=None):
+        """Open the CD library
+        
+        storage is a backend from mixcd_storage (JSONStorage by default,
+        BinarySnapshotStorage for fast startup, or SQLiteStorage for
+        large libraries).
+        """
+        self.db_file = db_file
+        self.storage = storage or JSONStorage(db_file)
+        self.search_index = None
+        
+        # Picker index: CD ids in library order, and unique display labels both ways
+        self.cd_order = []
+        self.labels = {}
+        self.label_ids = {}
         self.load_database()
     
     def load_database(self):
-        """Load mix CD database from file"""
+        """Load mix CD database from storage"""
         try:
-            if os.path.exists(self.db_file):
-                with open(self.db_file, 'r', encoding='utf-8') as f:
-                    self.cds = json.load(f)
+            if self.storage.exists():
+                # Only titles and track counts are read here; tracklists load when a CD is used
+                index, loaded = self.storage.load_index()
+                self.cds = CDCollection(loaded, index=index, loader=self.storage.load_cd)
                 print(f"✓ Loaded {len(self.cds)} mix CDs from database")
             else:
                 # Initialize with the Replacements CD
-                self.cds = {
+                self.cds = CDCollection({
                     "replacements_best": {
                         "title": "Left of the Dial: Best of the Replacements 1981-1990",
                         "tracks": [
@@ -429,22 +1317,171 @@ class MixCDDatabase:
                             {"artist": "The Replacements", "track": "Left of the Dial", "album": "Tim"}
                         ]
                     }
-                }
+                }, loader=self.storage.load_cd)
                 self.save_database()
                 print("✓ Created new mix CD database")
         except Exception as e:
             print(f"Error loading database: {e}")
-            self.cds = {}
+            self.cds = CDCollection()
+        
+        self.cd_order = []
+        self.labels = {}
+        self.label_ids = {}
+        for cd_id, title, track_count in self.get_cd_summaries():
+            self.label_cd(cd_id, title, track_count)
     
-    def save_database(self):
-        """Save mix CD database to file"""
+    def save_database(self, compact=True):
+        """Save pending changes to storage"""
+        self.update_picker_index()
+        self.update_search_index()
         try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cds, f, indent=2, ensure_ascii=False)
+            self.storage.save(self.cds, compact=compact)
+            self.cds.mark_saved()
             print("✓ Database saved")
         except Exception as e:
             print(f"Error saving database: {e}")
     
+    def add_cd(self, cd_id, title, tracks):
+        """Add or replace a single CD and save it"""
+        self.cds[cd_id] = {
+            "title": title,
+            "tracks": tracks
+        }
+        self.save_database()
+    
+    def import_cds(self, items, batch_size=200):
+        """Add a stream of CDs from mixcd_import.read_cds, saving batch_size CDs at a time
+        
+        Each batch is one journal append (or one SQLite transaction), and
+        saved CDs are dropped from memory so the import runs in flat memory
+        however large the input is. ImportProblems are printed and skipped.
+        Returns counts of imported CDs, tracks, replaced CDs and problems.
+        """
+        stats = {'cds': 0, 'tracks': 0, 'replaced': 0, 'problems': 0}
+        batch = []
+        
+        def save_batch():
+            self.save_database(compact=False)
+            self.cds.unload([cd_id for cd_id in batch if self.storage.can_load(cd_id)])
+            batch.clear()
+        
+        for item in items:
+            if isinstance(item, ImportProblem):
+                stats['problems'] += 1
+                print(f"✗ {item.source}:{item.line_number}: {item.message}")
+                continue
+            
+            if item.cd_id in self.cds:
+                stats['replaced'] += 1
+            self.cds[item.cd_id] = {"title": item.title, "tracks": item.tracks}
+            stats['cds'] += 1
+            stats['tracks'] += len(item.tracks)
+            batch.append(item.cd_id)
+            if len(batch) >= batch_size:
+                save_batch()
+        
+        save_batch()
+        # Fold the batches into one snapshot now rather than once per batch
+        self.save_database()
+        
+        print(f"✓ Imported {stats['cds']} CDs ({stats['tracks']} tracks)"
+              + (f", {stats['replaced']} replaced" if stats['replaced'] else ""))
+        if stats['problems']:
+            print(f"⚠ Skipped {stats['problems']} problem(s)")
+        return stats
+    
+    def find_tracks(self, artist=None, track=None, album=None):
+        """Find tracks by artist, track and/or album name (case-insensitive)
+        
+        Returns a list of (cd_id, track_number, track_info) tuples.
+        """
+        if hasattr(self.storage, 'find_tracks'):
+            return self.storage.find_tracks(artist, track, album)
+        
+        # Storage without indexes: scan the library
+        wanted = {key: value.lower() for key, value in (('artist', artist), ('track', track), ('album', album))
+                  if value is not None}
+        if not wanted:
+            return []
+        matches = []
+        for cd_id, cd_info in self.cds.items():
+            for i, track_info in enumerate(cd_info['tracks'], 1):
+                if all((track_info.get(key) or '').lower() == value for key, value in wanted.items()):
+                    matches.append((cd_id, i, track_info))
+        return matches
+    
+    def label_cd(self, cd_id, title, track_count):
+        """Add or refresh a CD's picker label, keeping its place in the order"""
+        label = self.labels.pop(cd_id, None)
+        if label is None:
+            self.cd_order.append(cd_id)
+        else:
+            del self.label_ids[label]
+        
+        label = f"{title} ({track_count} tracks)"
+        if label in self.label_ids:
+            # Another CD already shows this; the id keeps the two apart
+            label = f"{label} [{cd_id}]"
+        self.labels[cd_id] = label
+        self.label_ids[label] = cd_id
+    
+    def unlabel_cd(self, cd_id):
+        """Drop a removed CD from the picker index"""
+        label = self.labels.pop(cd_id, None)
+        if label is not None:
+            del self.label_ids[label]
+            self.cd_order.remove(cd_id)
+    
+    def update_picker_index(self):
+        """Relabel the CDs added, changed or removed since the last save"""
+        for cd_id in self.cds.removed:
+            self.unlabel_cd(cd_id)
+        for cd_id in self.cds.changed:
+            if cd_id in self.cds:
+                title, track_count = self.cds.index[cd_id]
+                self.label_cd(cd_id, title, track_count)
+    
+    def get_cd_labels(self):
+        """Display labels for the CD pickers, in library order (unique even for duplicate titles)"""
+        return [self.labels[cd_id] for cd_id in self.cd_order]
+    
+    def get_cd_id_for_label(self, label):
+        """Look up the CD a picker label stands for, or None"""
+        return self.label_ids.get(label)
+    
+    def get_cd_id_at(self, position):
+        """Look up the CD at a 0-based position in the picker, or None"""
+        if 0 <= position < len(self.cd_order):
+            return self.cd_order[position]
+        return None
+    
+    def get_search_index(self):
+        """Get the search index, building it from the whole library on first use"""
+        if self.search_index is None:
+            index = SearchIndex()
+            for cd_id, cd_info in self.cds.items():
+                index.add_cd(cd_id, cd_info)
+            self.search_index = index
+        return self.search_index
+    
+    def update_search_index(self):
+        """Re-index the CDs added, changed or removed since the last save"""
+        if self.search_index is None:
+            return
+        for cd_id in self.cds.removed:
+            self.search_index.remove_cd(cd_id)
+        for cd_id in self.cds.changed:
+            self.search_index.add_cd(cd_id, self.cds[cd_id])
+    
+    def search(self, query, limit=20):
+        """Search CD titles, artists, tracks and albums
+        
+        Matches whole words, word prefixes and near-misses, so "replac skywya"
+        still finds Skyway. Returns SearchHit(cd_id, track_number, score)
+        tuples, best first; track_number is None for a CD title match.
+        """
+        return self.get_search_index().search(query, limit)
+    
     def list_cds(self):
         """List all mix CDs in database"""
         if not self.cds:
@@ -453,8 +1490,12 @@ class MixCDDatabase:
         
         print("\nAvailable Mix CDs:")
         print("=" * 40)
-        for i, (cd_id, cd_info) in enumerate(self.cds.items(), 1):
-            print(f"{i}. {cd_info['title']} ({len(cd_info['tracks'])} tracks)")
+        for i, (cd_id, title, track_count) in enumerate(self.get_cd_summaries(), 1):
+            print(f"{i}. {title} ({track_count} tracks)")
+    
+    def get_cd_summaries(self):
+        """List (cd_id, title, track_count) for every CD without loading tracklists"""
+        return self.cds.summaries()
     
     def get_cd(self, cd_id):
         """Get a specific mix CD"""
@@ -498,14 +1539,15 @@ class MixCDDatabase:
                 if not track_input:
                     break
                 
-                parsed_track = self.parse_track_line(track_input)
-                if parsed_track:
+                parsed_track = parse_track(track_input)
+                if isinstance(parsed_track, TrackParseError):
+                    print(f"Invalid format at column {parsed_track.column} ({parsed_track.message}). "
+                          "Use: Artist - Track [Album]")
+                else:
                     tracks.append(parsed_track)
                     artist, track, album = parsed_track['artist'], parsed_track['track'], parsed_track['album']
                     print(f"  ✓ Added: {artist} - {track}" + (f" [{album}]" if album else ""))
                     track_num += 1
-                else:
-                    print("Invalid format. Use: Artist - Track [Album]")
         
         elif method == "2":
             # Bulk paste method
@@ -528,68 +1570,31 @@ class MixCDDatabase:
                 lines.append(line)
             
             # Parse all lines
-            for i, line in enumerate(lines, 1):
-                parsed_track = self.parse_track_line(line)
-                if parsed_track:
-                    tracks.append(parsed_track)
-                    artist, track, album = parsed_track['artist'], parsed_track['track'], parsed_track['album']
-                    print(f"  ✓ Track {i}: {artist} - {track}" + (f" [{album}]" if album else ""))
-                else:
-                    print(f"  ✗ Track {i}: Invalid format - {line}")
+            tracks, errors = self.parse_lines(lines)
+            for i, parsed_track in enumerate(tracks, 1):
+                artist, track, album = parsed_track['artist'], parsed_track['track'], parsed_track['album']
+                print(f"  ✓ Track {i}: {artist} - {track}" + (f" [{album}]" if album else ""))
+            for error in errors:
+                print(f"  ✗ Line {error.line_number}, column {error.column}: {error.message} - {error.text}")
         
         else:
             print("Invalid choice")
             return
         
         if tracks:
-            self.cds[cd_id] = {
-                "title": title,
-                "tracks": tracks
-            }
-            self.save_database()
+            self.add_cd(cd_id, title, tracks)
             print(f"\n✓ Added '{title}' with {len(tracks)} tracks")
         else:
             print("No tracks added")
     
     def parse_track_line(self, track_input):
-        """Parse a track line and clean up album names"""
-        if ' - ' not in track_input:
-            return None
-        
-        artist, rest = track_input.split(' - ', 1)
-        artist = artist.strip()
-        
-        # Check for album in brackets
-        if '[' in rest and ']' in rest:
-            track = rest[:rest.find('[')].strip()
-            album = rest[rest.find('[')+1:rest.find(']')].strip()
-            
-            # Clean up album names - remove "single", "EP", etc.
-            album_cleanups = [
-                ' single', ' EP', ' soundtrack', ' compilation',
-                'single #1', 'single #2', 'single #3'
-            ]
-            
-            # Remove these terms but keep the main album name
-            for cleanup in album_cleanups:
-                if cleanup in album:
-                    album = album.replace(cleanup, '').strip()
-            
-            # Remove trailing commas and extra spaces
-            album = album.rstrip(',').strip()
-            
-            # If album becomes empty or just punctuation, clear it
-            if not album or album in [',', '.', '-', ':']:
-                album = ""
-        else:
-            track = rest.strip()
-            album = ""
-        
-        return {
-            "artist": artist,
-            "track": track,
-            "album": album
-        }
+        """Parse a track line and clean up album names (None if it is not "Artist - Track [Album]")"""
+        track = parse_track(track_input)
+        return None if isinstance(track, TrackParseError) else track
+    
+    def parse_lines(self, lines):
+        """Parse many track lines at once; returns (tracks, errors), see mixcd_import.parse_lines"""
+        return parse_lines(lines)
     
     def select_cd(self):
         """Interactive CD selection"""
@@ -601,10 +1606,9 @@ class MixCDDatabase:
         
         try:
             choice = int(input(f"\nSelect CD (1-{len(self.cds)}): ")) - 1
-            cd_items = list(self.cds.items())
-            if 0 <= choice < len(cd_items):
-                cd_id, cd_info = cd_items[choice]
-                return cd_id, cd_info
+            cd_id = self.get_cd_id_at(choice)
+            if cd_id is not None:
+                return cd_id, self.cds[cd_id]
         except (ValueError, IndexError):
             print("Invalid selection")
         
@@ -616,6 +1620,7 @@ def main():
     
     scrobbler = LastFMScrobbler()
     cd_db = MixCDDatabase()
+    scrobbler.start_spool_flusher()
     
     while True:
         print("\n" + "="*40)
@@ -626,9 +1631,10 @@ def main():
         print("3. List all mix CDs")
         print("4. Test authentication")
         print("5. Reset credentials")
-        print("6. Exit")
+        print(f"6. Send queued CDs ({scrobbler.spool.job_count() if scrobbler.spool else 0} waiting)")
+        print("7. Exit")
         
-        choice = input("\nSelect option (1-6): ").strip()
+        choice = input("\nSelect option (1-7): ").strip()
         
         if choice == "1":
             # Select CD
@@ -649,18 +1655,10 @@ def main():
             
             time_choice = input("Select (1-3): ").strip()
             
+            end_time = None
             if time_choice == "1":
-                # Calculate start time based on selected tracks
-                if isinstance(track_selection, tuple):
-                    # Range selection
-                    num_tracks = track_selection[1] - track_selection[0] + 1
-                elif isinstance(track_selection, list):
-                    # Individual tracks
-                    num_tracks = len(track_selection)
-                else:
-                    # All tracks
-                    num_tracks = len(cd_info['tracks'])
-                start_time = datetime.now() - timedelta(minutes=num_tracks * 4)
+                # Planned backwards from now once the real track lengths are known
+                start_time, end_time = None, datetime.now()
             elif time_choice == "2":
                 hour = int(input("What hour (0-23)? "))
                 start_time = datetime.now().replace(hour=hour, minute=0, second=0)
@@ -672,16 +1670,27 @@ def main():
             else:
                 continue
             
+            # Queued CDs go out together as one run from option 6
+            if input("Scrobble now, or add it to the queue? (Enter = now, q = queue): ").strip().lower() == 'q':
+                if isinstance(track_selection, tuple):
+                    scrobbler.enqueue_cd(cd_info['tracks'], start_time, track_range=track_selection,
+                                         title=cd_info['title'], end_time=end_time)
+                elif isinstance(track_selection, list):
+                    scrobbler.enqueue_cd(track_selection, start_time, title=cd_info['title'], end_time=end_time)
+                else:
+                    scrobbler.enqueue_cd(cd_info['tracks'], start_time, title=cd_info['title'], end_time=end_time)
+                continue
+            
             # Handle different selection types
             if isinstance(track_selection, tuple):
                 # Range selection (start, end)
-                scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, track_range=track_selection)
+                scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, track_range=track_selection, end_time=end_time)
             elif isinstance(track_selection, list):
                 # Individual tracks - create a custom tracklist
-                scrobbler.scrobble_mix_cd(track_selection, start_time)
+                scrobbler.scrobble_mix_cd(track_selection, start_time, end_time=end_time)
             else:
                 # All tracks
-                scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time)
+                scrobbler.scrobble_mix_cd(cd_info['tracks'], start_time, end_time=end_time)
         
         elif choice == "2":
             cd_db.add_cd_interactive()
@@ -690,7 +1699,7 @@ def main():
             cd_db.list_cds()
         
         elif choice == "4":
-            scrobbler.ensure_authenticated()
+            scrobbler.ensure_authenticated(force=True)
             
         elif choice == "5":
             if os.path.exists(scrobbler.credentials_file):
@@ -699,8 +1708,17 @@ def main():
             scrobbler.api_key = None
             scrobbler.api_secret = None
             scrobbler.session_key = None
+            scrobbler.username = None
+            scrobbler.session_verified_at = None
             
         elif choice == "6":
+            if scrobbler.spool is None or not scrobbler.spool.job_count():
+                print("No CDs in the queue")
+            else:
+                scrobbler.process_queue()
+            
+        elif choice == "7":
+            scrobbler.close()
             print("Happy scrobbling! 🎵")
             break
         
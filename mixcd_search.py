@@ -0,0 +1,157 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import namedtuple, Counter
+
+# track_number is None when the CD title itself matched
+SearchHit = namedtuple('SearchHit', 'cd_id track_number score')
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+NGRAM_SIZE = 3
+
+# Score of a query word that matches a token exactly, as a prefix, or only by n-gram similarity
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.75
+FUZZY_SCORE = 0.5
+
+# Minimum Dice similarity of n-gram sets for a typo match
+FUZZY_THRESHOLD = 0.5
+
+def normalize(text):
+    """Split text into lower-case, accent-free word tokens
+
+    "Don't Tell A Soul" -> ['dont', 'tell', 'a', 'soul'], "Sigur Rós" -> ['sigur', 'ros']
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.casefold().replace("'", "").replace("’", "")
+    return TOKEN_PATTERN.findall(text)
+
+def ngrams(token):
+    """Character n-grams of a token, padded so the start and end count too"""
+    padded = f" {token} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+class SearchIndex:
+    """Inverted index over CD titles and every track's artist, name and album
+
+    Each CD title and each track is a document keyed (cd_id, track_number),
+    with track_number None for the title. A query word matches a token
+    exactly, as a prefix, or, when neither finds anything, by n-gram
+    similarity so small typos still match. Every query word has to match
+    for a document to be returned. CDs can be added, replaced or removed
+    one at a time without rebuilding the index.
+    """
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.grams = {}
+        self.cd_documents = {}
+
+    def __len__(self):
+        return sum(len(documents) for documents in self.cd_documents.values())
+
+    def add_cd(self, cd_id, cd_info):
+        """Index a CD, replacing whatever was indexed for it before"""
+        self.remove_cd(cd_id)
+        documents = [((cd_id, None), set(normalize(cd_info['title'])))]
+        for i, track_info in enumerate(cd_info['tracks'], 1):
+            tokens = set(normalize(track_info['artist']))
+            tokens.update(normalize(track_info['track']))
+            tokens.update(normalize(track_info.get('album')))
+            documents.append(((cd_id, i), tokens))
+
+        for key, tokens in documents:
+            for token in tokens:
+                keys = self.postings.get(token)
+                if keys is None:
+                    keys = self.postings[token] = set()
+                    self.add_token(token)
+                keys.add(key)
+        self.cd_documents[cd_id] = documents
+
+    def remove_cd(self, cd_id):
+        """Drop a CD from the index (no-op if it is not indexed)"""
+        for key, tokens in self.cd_documents.pop(cd_id, ()):
+            for token in tokens:
+                keys = self.postings[token]
+                keys.discard(key)
+                if not keys:
+                    del self.postings[token]
+                    self.remove_token(token)
+
+    def add_token(self, token):
+        bisect.insort(self.vocabulary, token)
+        for gram in ngrams(token):
+            self.grams.setdefault(gram, set()).add(token)
+
+    def remove_token(self, token):
+        del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+        for gram in ngrams(token):
+            tokens = self.grams[gram]
+            tokens.discard(token)
+            if not tokens:
+                del self.grams[gram]
+
+    def match_word(self, word, fuzzy=True):
+        """Map the tokens a query word matches to the score of that match"""
+        matches = {}
+        vocabulary = self.vocabulary
+        for i in range(bisect.bisect_left(vocabulary, word), len(vocabulary)):
+            token = vocabulary[i]
+            if not token.startswith(word):
+                break
+            matches[token] = EXACT_SCORE if token == word else PREFIX_SCORE
+
+        if matches or not fuzzy:
+            return matches
+
+        word_grams = ngrams(word)
+        shared = Counter(token for gram in word_grams for token in self.grams.get(gram, ()))
+        for token, count in shared.items():
+            similarity = 2 * count / (len(word_grams) + len(ngrams(token)))
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = FUZZY_SCORE * similarity
+        return matches
+
+    def search(self, query, limit=20, fuzzy=True):
+        """Find the CDs and tracks matching every word of query, best first
+
+        Returns up to limit SearchHit(cd_id, track_number, score) tuples.
+        """
+        words = normalize(query)
+        if not words:
+            return []
+        word_matches = [self.match_word(word, fuzzy) for word in dict.fromkeys(words)]
+        if not all(word_matches):
+            return []
+
+        # Start from the most selective word so the candidate set stays small
+        word_matches.sort(key=lambda matches: sum(len(self.postings[token]) for token in matches))
+        scores = {}
+        for token, score in word_matches[0].items():
+            for key in self.postings[token]:
+                if score > scores.get(key, 0):
+                    scores[key] = score
+
+        for matches in word_matches[1:]:
+            best = {}
+            for token, score in matches.items():
+                keys = self.postings[token]
+                # Walk whichever side of the intersection is smaller
+                if len(keys) < len(scores):
+                    common = [key for key in keys if key in scores]
+                else:
+                    common = [key for key in scores if key in keys]
+                for key in common:
+                    if score > best.get(key, 0):
+                        best[key] = score
+            scores = {key: scores[key] + score for key, score in best.items()}
+            if not scores:
+                return []
+
+        # Only the top hits are ordered; a common word can match most of the library
+        ranked = heapq.nsmallest(limit, scores.items(),
+                                 key=lambda item: (-item[1], item[0][0], item[0][1] or 0))
+        return [SearchHit(cd_id, track_number, round(score, 3)) for (cd_id, track_number), score in ranked]
@@ -0,0 +1,802 @@
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+TRACK_FIELDS = ('artist', 'track', 'album', 'duration')
+
+class Track(Mapping):
+    """One tracklist entry, a compact replacement for an {artist, track, album} dict
+
+    Reads like the dict it replaces (track['artist'], track.get('album'),
+    dict(track), == against a dict) but keeps its fields in slots instead of
+    a per-track dict, and interns artist and album names since those repeat
+    all over a library. duration is the optional track length in seconds.
+    Any other keys are kept in extra.
+    """
+    __slots__ = ('artist', 'track', 'album', 'duration', 'extra')
+
+    def __init__(self, artist, track, album=None, extra=None, duration=None):
+        self.artist = sys.intern(artist)
+        self.track = track
+        self.album = None if album is None else sys.intern(album)
+        self.duration = duration
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, track_info):
+        if isinstance(track_info, cls):
+            return track_info
+        extra = {key: value for key, value in track_info.items() if key not in TRACK_FIELDS}
+        return cls(track_info['artist'], track_info['track'], track_info.get('album'), extra,
+                   track_info.get('duration'))
+
+    def __getitem__(self, key):
+        if key in TRACK_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in ('artist', 'album'):
+            setattr(self, key, None if value is None else sys.intern(value))
+        elif key in ('track', 'duration'):
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __iter__(self):
+        yield 'artist'
+        yield 'track'
+        if self.album is not None:
+            yield 'album'
+        if self.duration is not None:
+            yield 'duration'
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return 2 + (self.album is not None) + (self.duration is not None) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"Track({dict(self)!r})"
+
+class MixCD(Mapping):
+    """A CD's title and tracklist of Track records, in slots
+
+    Reads and compares like the {title, tracks} dict it replaces.
+    Assigning cd['tracks'] = [...] converts the new tracklist to Track
+    records; dicts appended to it in place are still written correctly.
+    """
+    __slots__ = ('title', 'tracks', 'extra')
+
+    def __init__(self, title, tracks, extra=None):
+        self.title = title
+        self.tracks = [Track.from_dict(track_info) for track_info in tracks]
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, cd_info):
+        if isinstance(cd_info, cls):
+            return cd_info
+        extra = {key: value for key, value in cd_info.items() if key not in ('title', 'tracks')}
+        return cls(cd_info['title'], cd_info['tracks'], extra)
+
+    def __getitem__(self, key):
+        if key == 'title':
+            return self.title
+        if key == 'tracks':
+            return self.tracks
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'title':
+            self.title = value
+        elif key == 'tracks':
+            self.tracks = [Track.from_dict(track_info) for track_info in value]
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __iter__(self):
+        yield 'title'
+        yield 'tracks'
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return 2 + len(self.extra or ())
+
+    def __repr__(self):
+        return f"MixCD({self.title!r}, {len(self.tracks)} tracks)"
+
+def to_json(value):
+    """json.dumps default= hook that writes Track and MixCD records as plain objects"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class CDCollection(MutableMapping):
+    """Mapping of cd_id -> cd_info that loads tracklists on demand
+
+    Behaves like the plain dict MixCDDatabase.cds used to be, so the UIs can
+    keep assigning cds[cd_id] = {...} and iterating cds.items(). Every CD has
+    a (title, track_count) entry in a lightweight index; the full tracklist
+    is fetched through loader the first time the CD is accessed and kept in
+    a small LRU cache. CDs added or changed in this session stay in memory.
+    CDs are held as MixCD/Track records, so plain dicts assigned here are
+    converted on the way in.
+
+    Storage backends use the changed/removed sets to write only what is
+    needed. Call mark_changed(cd_id) after editing a CD's tracks in place.
+    """
+    def __init__(self, cds=None, index=None, loader=None, cache_size=8):
+        self.data = {cd_id: MixCD.from_dict(cd_info) for cd_id, cd_info in (cds or {}).items()}
+        if index is None:
+            index = {cd_id: (cd_info['title'], len(cd_info['tracks'])) for cd_id, cd_info in self.data.items()}
+        self.index = dict(index)
+        self.loader = loader
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.changed = set()
+        self.removed = set()
+
+    def __getitem__(self, cd_id):
+        if cd_id in self.data:
+            return self.data[cd_id]
+        if cd_id in self.cache:
+            self.cache.move_to_end(cd_id)
+            return self.cache[cd_id]
+        if cd_id not in self.index or self.loader is None:
+            raise KeyError(cd_id)
+
+        cd_info = MixCD.from_dict(self.loader(cd_id))
+        self.cache[cd_id] = cd_info
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return cd_info
+
+    def __setitem__(self, cd_id, cd_info):
+        cd_info = MixCD.from_dict(cd_info)
+        self.data[cd_id] = cd_info
+        self.cache.pop(cd_id, None)
+        self.index[cd_id] = (cd_info['title'], len(cd_info['tracks']))
+        self.changed.add(cd_id)
+        self.removed.discard(cd_id)
+
+    def __delitem__(self, cd_id):
+        del self.index[cd_id]
+        self.data.pop(cd_id, None)
+        self.cache.pop(cd_id, None)
+        self.changed.discard(cd_id)
+        self.removed.add(cd_id)
+
+    def __contains__(self, cd_id):
+        return cd_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return f"CDCollection({len(self.index)} CDs, {len(self.data) + len(self.cache)} loaded)"
+
+    def summaries(self):
+        """List (cd_id, title, track_count) for every CD without loading tracklists"""
+        return [(cd_id, title, track_count) for cd_id, (title, track_count) in self.index.items()]
+
+    def mark_changed(self, cd_id):
+        """Flag a CD that was modified in place so the next save picks it up"""
+        if cd_id in self.index:
+            cd_info = self[cd_id]
+            self.data[cd_id] = cd_info
+            self.cache.pop(cd_id, None)
+            self.index[cd_id] = (cd_info['title'], len(cd_info['tracks']))
+            self.changed.add(cd_id)
+
+    def mark_saved(self):
+        """Forget pending changes after a successful save"""
+        self.changed.clear()
+        self.removed.clear()
+
+    def unload(self, cd_ids):
+        """Drop saved CDs from memory; they are fetched through loader again when used"""
+        if self.loader is None:
+            return
+        for cd_id in cd_ids:
+            if cd_id not in self.changed:
+                self.data.pop(cd_id, None)
+
+class JSONStorage:
+    """Keeps the library in mix_cds.json plus an append-only change journal
+
+    A save appends one JSON line per added/replaced/deleted CD to
+    <db_file>.journal and fsyncs it, so its cost depends on the size of the
+    change rather than the library. Once the journal grows past
+    compact_every records or past the size of the snapshot, it is folded
+    into a fresh snapshot that is written to a temp file, fsynced and
+    renamed over mix_cds.json. A crash at any point leaves either the old
+    or the new snapshot, and replaying the journal on top is idempotent.
+
+    Each snapshot gets a <db_file>.idx sidecar with every CD's title, track
+    count and byte range, so startup only reads the index and a CD's
+    tracklist is parsed when it is first used. If the sidecar is missing or
+    older than the snapshot the whole file is parsed once and re-indexed.
+    CDs written to the journal since the last snapshot are read back from
+    their journal record the same way.
+    """
+    def __init__(self, db_file="mix_cds.json", compact_every=100):
+        self.db_file = db_file
+        self.journal_file = db_file + ".journal"
+        self.index_file = db_file + ".idx"
+        self.compact_every = compact_every
+        self.journal_records = 0
+        self.offsets = {}
+        self.journal_offsets = {}
+
+    def exists(self):
+        return os.path.exists(self.db_file) or os.path.exists(self.journal_file)
+
+    def load(self):
+        """Load the snapshot and replay the journal on top of it"""
+        cds = {}
+        if os.path.exists(self.db_file):
+            with open(self.db_file, 'r', encoding='utf-8') as f:
+                cds = json.load(f)
+        self.replay_journal(cds)
+        return cds
+
+    def load_index(self):
+        """Load titles and track counts without parsing tracklists
+
+        Returns (index, loaded) where index maps cd_id -> (title, track_count)
+        and loaded holds the CDs that already had to be parsed (from the
+        journal, or everything if the snapshot was not indexed).
+        """
+        sidecar = self.read_sidecar()
+        if sidecar is None:
+            cds = self.load()
+            if os.path.exists(self.db_file):
+                # Re-index so the next start is lazy again
+                self.compact(cds)
+            return {cd_id: (cd['title'], len(cd['tracks'])) for cd_id, cd in cds.items()}, cds
+
+        index = {}
+        self.offsets = {}
+        for cd_id, title, track_count, offset, length in sidecar['cds']:
+            index[cd_id] = (title, track_count)
+            self.offsets[cd_id] = (offset, length)
+        return index, self.overlay_journal(index)
+
+    def overlay_journal(self, index):
+        """Apply the journal to an index, returning the CDs it added or replaced"""
+        loaded = {}
+        for op, cd_id, cd_info in self.read_journal():
+            if op == 'put':
+                index[cd_id] = (cd_info['title'], len(cd_info['tracks']))
+                loaded[cd_id] = cd_info
+            elif op == 'delete':
+                index.pop(cd_id, None)
+                loaded.pop(cd_id, None)
+        return loaded
+
+    def load_cd(self, cd_id):
+        """Parse a single CD straight out of the journal or the snapshot"""
+        if cd_id in self.journal_offsets:
+            offset, length = self.journal_offsets[cd_id]
+            with open(self.journal_file, 'rb') as f:
+                f.seek(offset)
+                return json.loads(f.read(length).decode('utf-8'))['cd']
+
+        offset, length = self.offsets[cd_id]
+        with open(self.db_file, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length).decode('utf-8'))
+
+    def can_load(self, cd_id):
+        """Whether load_cd can read this CD back from disk"""
+        return cd_id in self.journal_offsets or cd_id in self.offsets
+
+    def read_sidecar(self):
+        """Read the snapshot's byte-offset index, or None if it is missing or stale"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+            stat = os.stat(self.db_file)
+        except (OSError, ValueError):
+            return None
+        if sidecar.get('size') != stat.st_size or sidecar.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+        return sidecar
+
+    def read_journal(self):
+        """Yield (op, cd_id, cd_info) for every complete journal record"""
+        self.journal_records = 0
+        self.journal_offsets = {}
+        if not os.path.exists(self.journal_file):
+            return
+
+        good_bytes = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # Torn write from a crash mid-append
+                    break
+                self.journal_records += 1
+                if record['op'] == 'put':
+                    self.journal_offsets[record['id']] = (good_bytes, len(line))
+                else:
+                    self.journal_offsets.pop(record['id'], None)
+                good_bytes += len(line)
+                yield record['op'], record['id'], record.get('cd')
+
+        # Cut off the torn tail so later appends start on a clean line
+        if good_bytes < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(good_bytes)
+
+    def replay_journal(self, cds):
+        """Apply the journal to a dict of fully loaded CDs"""
+        for op, cd_id, cd_info in self.read_journal():
+            if op == 'put':
+                cds[cd_id] = cd_info
+            elif op == 'delete':
+                cds.pop(cd_id, None)
+
+    def save(self, cds, compact=True):
+        """Append the pending changes to the journal, compacting when it gets large
+
+        Pass compact=False to only append (bulk imports save many batches
+        and compact once at the end).
+        """
+        changed = getattr(cds, 'changed', None)
+        if changed is None or not os.path.exists(self.db_file):
+            self.compact(cds)
+            return
+
+        if len(changed) > 1:
+            # Keep library order so new CDs replay in the order they were added
+            changed = [cd_id for cd_id in cds if cd_id in changed]
+        records = [{"op": "delete", "id": cd_id} for cd_id in cds.removed]
+        records += [{"op": "put", "id": cd_id, "cd": cds[cd_id]} for cd_id in changed]
+
+        if records:
+            with open(self.journal_file, 'ab') as f:
+                position = f.seek(0, os.SEEK_END)
+                for record in records:
+                    line = (json.dumps(record, ensure_ascii=False, default=to_json) + "\n").encode('utf-8')
+                    f.write(line)
+                    if record['op'] == 'put':
+                        self.journal_offsets[record['id']] = (position, len(line))
+                    else:
+                        self.journal_offsets.pop(record['id'], None)
+                    position += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records += len(records)
+
+        if compact and self.journal_records and (
+                self.journal_records >= self.compact_every
+                or os.path.getsize(self.journal_file) > os.path.getsize(self.db_file)):
+            self.compact(cds)
+
+    def compact(self, cds):
+        """Write the full library as a new snapshot and empty the journal
+
+        The snapshot is byte-for-byte what json.dump(cds, indent=2) writes;
+        it is assembled per CD so each CD's byte range can be indexed.
+        """
+        parts = [b"{"]
+        position = 1
+        entries = []
+        offsets = {}
+        for i, cd_id in enumerate(cds):
+            # json.dumps would write a number unquoted and leave an unreadable object key
+            if not isinstance(cd_id, str):
+                raise TypeError(f"CD id {cd_id!r} is not a string")
+            cd_info = cds[cd_id]
+            prefix = ("," if i else "") + "\n  " + json.dumps(cd_id, ensure_ascii=False) + ": "
+            value = json.dumps(cd_info, indent=2, ensure_ascii=False, default=to_json).replace("\n", "\n  ").encode('utf-8')
+            prefix = prefix.encode('utf-8')
+            offset = position + len(prefix)
+            parts += [prefix, value]
+            position = offset + len(value)
+            entries.append([cd_id, cd_info['title'], len(cd_info['tracks']), offset, len(value)])
+            offsets[cd_id] = (offset, len(value))
+        parts.append(b"\n}" if entries else b"}")
+
+        write_atomically(self.db_file, b"".join(parts))
+        stat = os.stat(self.db_file)
+        write_atomically(self.index_file, json.dumps({
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "cds": entries
+        }, ensure_ascii=False).encode('utf-8'))
+
+        self.offsets = offsets
+        self.journal_offsets = {}
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.journal_records = 0
+
+    def close(self):
+        pass
+
+def write_atomically(path, content):
+    """Replace a file via temp file + fsync + rename so readers never see a partial write"""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Make the rename itself durable where the platform allows it
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# Binary snapshot layout, all little-endian: header, string refs, string bytes, CD records, track records
+SNAPSHOT_MAGIC = b"MXCB"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<4sHHQqIIIIQQQQ")
+STRING_REF = struct.Struct("<II")      # byte offset into the string bytes, byte length
+CD_RECORD = struct.Struct("<IIII")     # id string, title string, first track record, track count
+TRACK_RECORD = struct.Struct("<IIII")  # artist, track and album strings, duration in seconds (0 if unknown)
+
+class LibrarySnapshot:
+    """Read-only binary snapshot of the library, accessed through mmap
+
+    Every distinct string is stored once in a string table, and CDs and
+    tracks are fixed-width records of string numbers, so any CD can be
+    found by position without parsing the rest of the file. Nothing is
+    decoded until it is asked for, and decoded strings are interned so a
+    repeated artist or album name is a single object in memory.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.strings = {}
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, _, self.source_size, self.source_mtime_ns, self.cd_count, self.track_count,
+             self.string_count, _, self.string_refs, self.string_data, self.cd_records,
+             self.track_records) = SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"{path} is not a library snapshot: {e}")
+
+        expected_size = self.track_records + self.track_count * TRACK_RECORD.size
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or len(self.map) != expected_size:
+            self.close()
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} library snapshot")
+
+    def string(self, number):
+        text = self.strings.get(number)
+        if text is None:
+            offset, length = STRING_REF.unpack_from(self.map, self.string_refs + number * STRING_REF.size)
+            start = self.string_data + offset
+            text = sys.intern(self.map[start:start + length].decode('utf-8'))
+            self.strings[number] = text
+        return text
+
+    def cd_entry(self, position):
+        """Get (cd_id, title, first_track, track_count) of the CD at a position"""
+        id_number, title_number, first_track, track_count = CD_RECORD.unpack_from(
+            self.map, self.cd_records + position * CD_RECORD.size
+        )
+        return self.string(id_number), self.string(title_number), first_track, track_count
+
+    def cd_entries(self):
+        """Yield (cd_id, title, first_track, track_count) for every CD, in library order"""
+        string = self.string
+        records = self.map[self.cd_records:self.cd_records + self.cd_count * CD_RECORD.size]
+        for id_number, title_number, first_track, track_count in CD_RECORD.iter_unpack(records):
+            yield string(id_number), string(title_number), first_track, track_count
+
+    def tracks(self, first_track, track_count):
+        """Decode a run of track records into Track records"""
+        start = self.track_records + first_track * TRACK_RECORD.size
+        records = self.map[start:start + track_count * TRACK_RECORD.size]
+        string = self.string
+        return [Track(string(artist), string(track), string(album), duration=duration or None)
+                for artist, track, album, duration in TRACK_RECORD.iter_unpack(records)]
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+def write_snapshot(path, cds, source_size, source_mtime_ns):
+    """Write a dict of cd_id -> cd_info as a LibrarySnapshot file"""
+    numbers = {}
+
+    def number(text):
+        text = text or ''
+        if text not in numbers:
+            numbers[text] = len(numbers)
+        return numbers[text]
+
+    cd_records = bytearray()
+    track_records = bytearray()
+    first_track = 0
+    for cd_id, cd_info in cds.items():
+        tracks = cd_info['tracks']
+        cd_records += CD_RECORD.pack(number(cd_id), number(cd_info['title']), first_track, len(tracks))
+        for track in tracks:
+            track_records += TRACK_RECORD.pack(number(track['artist']), number(track['track']),
+                                               number(track.get('album')), int(track.get('duration') or 0))
+        first_track += len(tracks)
+
+    string_refs = bytearray()
+    string_data = bytearray()
+    for text in numbers:
+        encoded = text.encode('utf-8')
+        string_refs += STRING_REF.pack(len(string_data), len(encoded))
+        string_data += encoded
+
+    string_refs_at = SNAPSHOT_HEADER.size
+    string_data_at = string_refs_at + len(string_refs)
+    cd_records_at = string_data_at + len(string_data)
+    track_records_at = cd_records_at + len(cd_records)
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, source_size, source_mtime_ns, len(cds), first_track,
+        len(numbers), 0, string_refs_at, string_data_at, cd_records_at, track_records_at
+    )
+    write_atomically(path, b"".join([header, string_refs, string_data, cd_records, track_records]))
+
+class BinarySnapshotStorage(JSONStorage):
+    """JSONStorage that starts up from a memory-mapped binary snapshot
+
+    mix_cds.json and its journal stay the source of truth and are written
+    exactly as JSONStorage writes them. <db_file>.bin holds the same library
+    as a LibrarySnapshot, so opening the library decodes only CD ids and
+    titles, and a CD's tracks are decoded when it is first used. The
+    snapshot remembers the size and mtime of the JSON it was built from and
+    is rebuilt whenever mix_cds.json has changed since.
+    """
+    def __init__(self, db_file="mix_cds.json", compact_every=100):
+        super().__init__(db_file, compact_every)
+        self.snapshot_file = db_file + ".bin"
+        self.snapshot = None
+        self.positions = {}
+
+    def open_snapshot(self):
+        """Map the binary snapshot, rebuilding it first if it is missing or stale"""
+        self.close()
+        stat = os.stat(self.db_file)
+        try:
+            snapshot = LibrarySnapshot(self.snapshot_file)
+            if (snapshot.source_size, snapshot.source_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                snapshot.close()
+                snapshot = None
+        except (OSError, ValueError):
+            snapshot = None
+
+        if snapshot is None:
+            with open(self.db_file, 'r', encoding='utf-8') as f:
+                cds = json.load(f)
+            write_snapshot(self.snapshot_file, cds, stat.st_size, stat.st_mtime_ns)
+            snapshot = LibrarySnapshot(self.snapshot_file)
+        self.snapshot = snapshot
+
+    def load_index(self):
+        """Load CD ids, titles and track counts from the snapshot, then apply the journal"""
+        index = {}
+        self.positions = {}
+        if os.path.exists(self.db_file):
+            self.open_snapshot()
+            for position, (cd_id, title, _, track_count) in enumerate(self.snapshot.cd_entries()):
+                index[cd_id] = (title, track_count)
+                self.positions[cd_id] = position
+        return index, self.overlay_journal(index)
+
+    def load_cd(self, cd_id):
+        """Decode a single CD from the snapshot (or read it from the journal)"""
+        if cd_id in self.journal_offsets:
+            return super().load_cd(cd_id)
+        _, title, first_track, track_count = self.snapshot.cd_entry(self.positions[cd_id])
+        return MixCD(title, self.snapshot.tracks(first_track, track_count))
+
+    def can_load(self, cd_id):
+        return cd_id in self.journal_offsets or cd_id in self.positions
+
+    def compact(self, cds):
+        """Write a new JSON snapshot and the matching binary snapshot"""
+        # Read every CD once, while the old snapshot is still mapped
+        cds = {cd_id: cds[cd_id] for cd_id in cds}
+        super().compact(cds)
+
+        stat = os.stat(self.db_file)
+        self.close()
+        write_snapshot(self.snapshot_file, cds, stat.st_size, stat.st_mtime_ns)
+        self.snapshot = LibrarySnapshot(self.snapshot_file)
+        self.positions = {cd_id: position for position, cd_id in enumerate(cds)}
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+class SQLiteStorage:
+    """Keeps the library in normalized cds/tracks tables with indexed lookups
+
+    Only the CDs that changed since the last save are written, each save in
+    a single transaction. Pass migrate_from to import an existing
+    mix_cds.json the first time the database is created.
+    """
+    def __init__(self, db_file="mix_cds.db", migrate_from=None):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cds (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    position INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tracks (
+                    cd_id TEXT NOT NULL REFERENCES cds(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    artist TEXT NOT NULL COLLATE NOCASE,
+                    track TEXT NOT NULL COLLATE NOCASE,
+                    album TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                    duration INTEGER,
+                    PRIMARY KEY (cd_id, position)
+                );
+                CREATE INDEX IF NOT EXISTS cds_position ON cds(position);
+                CREATE INDEX IF NOT EXISTS tracks_artist ON tracks(artist);
+                CREATE INDEX IF NOT EXISTS tracks_track ON tracks(track);
+                CREATE INDEX IF NOT EXISTS tracks_album ON tracks(album);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+            # Databases created before track durations were stored
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tracks)")]
+            if 'duration' not in columns:
+                self.conn.execute("ALTER TABLE tracks ADD COLUMN duration INTEGER")
+
+        if migrate_from:
+            self.migrate_from_json(migrate_from)
+
+    def exists(self):
+        return self.conn.execute("SELECT 1 FROM meta WHERE key = 'initialized'").fetchone() is not None
+
+    def migrate_from_json(self, json_file):
+        """One-shot import of an existing JSON library into an empty database
+
+        Returns the number of CDs imported. The JSON file is left untouched.
+        """
+        if self.exists() or not os.path.exists(json_file):
+            return 0
+
+        cds = JSONStorage(json_file).load()
+        with self.conn:
+            for cd_id, cd_info in cds.items():
+                self.write_cd(cd_id, cd_info)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (json_file,))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('initialized', '1')")
+        print(f"✓ Migrated {len(cds)} mix CDs from {json_file}")
+        return len(cds)
+
+    def load(self):
+        """Load every CD as a dict of cd_id -> cd_info, in insertion order"""
+        cds = {}
+        for cd_id, title in self.conn.execute("SELECT id, title FROM cds ORDER BY position"):
+            cds[cd_id] = {"title": title, "tracks": []}
+
+        rows = self.conn.execute("SELECT cd_id, artist, track, album, duration FROM tracks ORDER BY cd_id, position")
+        for cd_id, artist, track, album, duration in rows:
+            track_info = {"artist": artist, "track": track, "album": album}
+            if duration is not None:
+                track_info["duration"] = duration
+            cds[cd_id]["tracks"].append(track_info)
+        return cds
+
+    def load_index(self):
+        """Load titles and track counts without loading tracklists
+
+        Returns (index, loaded) like JSONStorage.load_index; nothing is
+        preloaded since every CD can be fetched by id.
+        """
+        rows = self.conn.execute("""
+            SELECT cds.id, cds.title, COUNT(tracks.position)
+            FROM cds LEFT JOIN tracks ON tracks.cd_id = cds.id
+            GROUP BY cds.id ORDER BY cds.position
+        """)
+        return {cd_id: (title, track_count) for cd_id, title, track_count in rows}, {}
+
+    def load_cd(self, cd_id):
+        """Load one CD and its tracklist"""
+        title = self.conn.execute("SELECT title FROM cds WHERE id = ?", (cd_id,)).fetchone()[0]
+        rows = self.conn.execute(
+            "SELECT artist, track, album, duration FROM tracks WHERE cd_id = ? ORDER BY position", (cd_id,)
+        )
+        return MixCD(title, [Track(artist, track, album, duration=duration) for artist, track, album, duration in rows])
+
+    def write_cd(self, cd_id, cd_info):
+        """Insert or replace one CD and its tracks (caller owns the transaction)"""
+        row = self.conn.execute("SELECT position FROM cds WHERE id = ?", (cd_id,)).fetchone()
+        if row:
+            position = row[0]
+            self.conn.execute("UPDATE cds SET title = ? WHERE id = ?", (cd_info['title'], cd_id))
+            self.conn.execute("DELETE FROM tracks WHERE cd_id = ?", (cd_id,))
+        else:
+            position = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM cds").fetchone()[0]
+            self.conn.execute("INSERT INTO cds (id, title, position) VALUES (?, ?, ?)",
+                              (cd_id, cd_info['title'], position))
+
+        self.conn.executemany(
+            "INSERT INTO tracks (cd_id, position, artist, track, album, duration) VALUES (?, ?, ?, ?, ?, ?)",
+            [(cd_id, i, t['artist'], t['track'], t.get('album') or '', t.get('duration'))
+             for i, t in enumerate(cd_info['tracks'])]
+        )
+
+    def can_load(self, cd_id):
+        return True
+
+    def save(self, cds, compact=True):
+        """Write the CDs that changed and delete the removed ones, in one transaction"""
+        changed = getattr(cds, 'changed', None)
+        removed = getattr(cds, 'removed', set())
+        if changed is None:
+            # Plain dict with no change tracking: write everything
+            changed = set(cds)
+
+        with self.conn:
+            for cd_id in removed:
+                self.conn.execute("DELETE FROM cds WHERE id = ?", (cd_id,))
+            for cd_id in changed:
+                self.write_cd(cd_id, cds[cd_id])
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('initialized', '1')")
+
+    def find_tracks(self, artist=None, track=None, album=None):
+        """Case-insensitive exact lookup by artist, track and/or album
+
+        Returns a list of (cd_id, track_number, track_info) tuples.
+        """
+        conditions = []
+        values = []
+        for column, value in (('artist', artist), ('track', track), ('album', album)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        if not conditions:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT cd_id, position, artist, track, album FROM tracks WHERE " + " AND ".join(conditions)
+            + " ORDER BY cd_id, position",
+            values
+        )
+        return [(cd_id, position + 1, {"artist": a, "track": t, "album": al})
+                for cd_id, position, a, t, al in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,15 @@
+from collections import namedtuple
+
+# Progress events emitted during a scrobble run (see LastFMScrobbler.subscribe).
+# They live in their own module so subscribers such as ScrobbleMetrics see the
+# same classes even when mixcd_scrobbler is run as __main__.
+# run_id is None for scrobbles sent outside a run, e.g. by the spool flusher.
+# scrobble is the submitted dict (artist, track, album, timestamp, track_number);
+# outcome is 'accepted', 'ignored' or 'failed', or 'duplicate' for a track that was
+# skipped because it was already scrobbled or is still waiting in the spool.
+RunStarted = namedtuple('RunStarted', ['run_id', 'track_count', 'tracklist_length', 'track_range',
+                                       'start_time', 'avg_track_length', 'requests'])
+TrackSubmitted = namedtuple('TrackSubmitted', ['run_id', 'track_number', 'scrobble'])
+TrackResult = namedtuple('TrackResult', ['run_id', 'track_number', 'scrobble', 'outcome'])
+BatchFlushed = namedtuple('BatchFlushed', ['run_id', 'size', 'accepted', 'ignored', 'failed'])
+RunFinished = namedtuple('RunFinished', ['run_id', 'stats'])
@@ -0,0 +1,92 @@
+import sqlite3
+import threading
+import time
+
+# Scrobbles of the same track closer together than this (seconds) count as duplicates
+DUPLICATE_WINDOW = 15 * 60
+
+class ScrobbleHistory:
+    """Local record of what has already been scrobbled, to catch duplicates before sending
+
+    Every scrobble Last.fm accepted or ignored is stored on disk keyed by
+    (artist, track, timestamp bucket), with artist and track compared
+    case-insensitively. A scrobble counts as a duplicate when the same
+    track was already scrobbled less than window seconds away from it,
+    which catches pressing "Scrobble!" twice for the same CD even though
+    the second run's timestamps drift a little.
+
+    Lookups go through an in-memory set of key hashes first, so the
+    database is only read for likely duplicates. Last.fm ignores scrobbles
+    more than two weeks old, so older history is pruned on open.
+    """
+    def __init__(self, history_file="scrobble_history.db", window=DUPLICATE_WINDOW, retention_days=15):
+        self.history_file = history_file
+        self.window = window
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(history_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS scrobble_history (
+                    artist_key TEXT NOT NULL,
+                    track_key TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    scrobbled_at INTEGER NOT NULL,
+                    PRIMARY KEY (artist_key, track_key, bucket)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS scrobble_history_timestamp ON scrobble_history(timestamp)"
+            )
+            self.conn.execute("DELETE FROM scrobble_history WHERE timestamp < ?",
+                              (int(time.time()) - retention_days * 24 * 60 * 60,))
+
+        self.hashes = {hash(row) for row in self.conn.execute(
+            "SELECT artist_key, track_key, bucket FROM scrobble_history"
+        )}
+
+    def key(self, scrobble):
+        """(artist_key, track_key, bucket, timestamp) for a scrobble dict"""
+        timestamp = int(scrobble['timestamp'].timestamp())
+        return (scrobble['artist'].strip().casefold(), scrobble['track'].strip().casefold(),
+                timestamp // self.window, timestamp)
+
+    def find_duplicates(self, scrobbles):
+        """Return one flag per scrobble: True if it is already in the history"""
+        flags = []
+        with self.lock:
+            for scrobble in scrobbles:
+                artist_key, track_key, bucket, timestamp = self.key(scrobble)
+                # A scrobble within the window can sit in this bucket or either neighbour
+                buckets = [b for b in (bucket - 1, bucket, bucket + 1)
+                           if hash((artist_key, track_key, b)) in self.hashes]
+                flags.append(bool(buckets) and self.conn.execute(
+                    "SELECT 1 FROM scrobble_history WHERE artist_key = ? AND track_key = ? "
+                    f"AND bucket IN ({', '.join('?' * len(buckets))}) AND ABS(timestamp - ?) < ? LIMIT 1",
+                    (artist_key, track_key, *buckets, timestamp, self.window)
+                ).fetchone() is not None)
+        return flags
+
+    def record(self, scrobbles):
+        """Remember scrobbles that Last.fm has acknowledged"""
+        now = int(time.time())
+        rows = [self.key(scrobble) + (now,) for scrobble in scrobbles]
+        if not rows:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO scrobble_history (artist_key, track_key, bucket, timestamp, scrobbled_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.hashes.update(hash(row[:3]) for row in rows)
+
+    def count(self):
+        """Number of scrobbles in the history"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scrobble_history").fetchone()[0]
+
+    def close(self):
+        """Close the history database"""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+
+from scrobble_events import BatchFlushed, RunFinished
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf'))
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, mean, min and max"""
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return None
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return self.max if bound == float('inf') else min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': {('inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in zip(LATENCY_BUCKETS, self.buckets)}
+        }
+
+class ScrobbleMetrics:
+    """Latency, throughput and outcome counters for a LastFMScrobbler
+
+    The scrobbler records every HTTP call here. Scrobble outcomes and run
+    throughput come from its progress events, since this object is
+    subscribed to them. If metrics_file is set, one JSON line per finished
+    run (plus one on close) is appended to it for comparing releases.
+    """
+    def __init__(self, metrics_file=None):
+        self.metrics_file = metrics_file
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.latency = {}
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.bytes_sent = 0
+        self.scrobbles = {'accepted': 0, 'ignored': 0, 'failed': 0}
+        self.runs = 0
+        self.run_tracks = 0
+        self.run_seconds = 0.0
+        self.last_run = None
+
+    def record_request(self, method, seconds, bytes_sent, ok=True):
+        """Record one HTTP call to the Last.fm API"""
+        with self.lock:
+            self.latency.setdefault(method, LatencyHistogram()).add(seconds)
+            self.requests[method] = self.requests.get(method, 0) + 1
+            if not ok:
+                self.errors[method] = self.errors.get(method, 0) + 1
+            self.bytes_sent += bytes_sent
+
+    def record_retries(self, method, retries):
+        with self.lock:
+            self.retries[method] = self.retries.get(method, 0) + retries
+
+    def __call__(self, event):
+        """Progress subscriber: count batch outcomes and run throughput"""
+        if isinstance(event, BatchFlushed):
+            with self.lock:
+                self.scrobbles['accepted'] += event.accepted
+                self.scrobbles['ignored'] += event.ignored
+                self.scrobbles['failed'] += event.failed
+
+        elif isinstance(event, RunFinished):
+            stats = event.stats
+            elapsed = stats['elapsed_seconds']
+            with self.lock:
+                self.runs += 1
+                self.run_tracks += stats['total']
+                self.run_seconds += elapsed
+                self.last_run = {
+                    'tracks': stats['total'],
+                    'requests': stats['requests'],
+                    'seconds': elapsed,
+                    'tracks_per_second': stats['total'] / elapsed if elapsed else None
+                }
+            self.write_line('run', run=self.last_run)
+
+    def snapshot(self):
+        """Current metrics as a JSON-serializable dict"""
+        with self.lock:
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'requests': {
+                    method: {
+                        'count': self.requests[method],
+                        'errors': self.errors.get(method, 0),
+                        'retries': self.retries.get(method, 0),
+                        'latency': self.latency[method].snapshot()
+                    }
+                    for method in self.requests
+                },
+                'bytes_sent': self.bytes_sent,
+                'scrobbles': dict(self.scrobbles),
+                'runs': {
+                    'count': self.runs,
+                    'tracks': self.run_tracks,
+                    'seconds': self.run_seconds,
+                    'tracks_per_second': self.run_tracks / self.run_seconds if self.run_seconds else None,
+                    'last': self.last_run
+                }
+            }
+
+    def write_line(self, kind, **extra):
+        """Append a timestamped snapshot to the metrics file, if one is configured"""
+        if not self.metrics_file:
+            return
+        record = {'time': time.time(), 'kind': kind}
+        record.update(extra)
+        record['metrics'] = self.snapshot()
+        try:
+            with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# A CD (or part of one) waiting in the scrobble queue; times are datetimes. When
+# ends_at_end_time is set the start time is only an estimate and the tracks are
+# planned backwards from end_time.
+ScrobbleJob = namedtuple('ScrobbleJob', ['job_id', 'title', 'tracks', 'start_time', 'end_time',
+                                         'avg_track_length', 'allow_duplicates', 'ends_at_end_time'])
+JOB_COLUMNS = "id, title, tracks, start_time, end_time, avg_track_length, allow_duplicates, ends_at_end_time"
+
+class ScrobbleSpool:
+    """Persistent queue of scrobbles that Last.fm has not acknowledged yet
+
+    Rows are written before they are submitted and deleted only once Last.fm
+    has accepted or ignored them. Rows handed out for submission are marked
+    in flight so the flusher and a running scrobble never send the same row
+    twice; anything still in flight when the app died is released again on
+    the next start.
+
+    The same database holds the scrobble queue: CDs the user has listened
+    to but that have not been planned into scrobbles yet. A job is deleted
+    in the same transaction that spools its scrobbles, so after a crash it
+    is either still queued or fully in the spool, never both.
+    """
+    def __init__(self, spool_file="scrobble_spool.db"):
+        self.spool_file = spool_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(spool_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_scrobbles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    artist TEXT NOT NULL,
+                    track TEXT NOT NULL,
+                    album TEXT NOT NULL DEFAULT '',
+                    timestamp INTEGER NOT NULL,
+                    queued_at INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    in_flight INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS scrobble_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    tracks TEXT NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    end_time INTEGER NOT NULL,
+                    avg_track_length REAL NOT NULL,
+                    allow_duplicates INTEGER NOT NULL DEFAULT 0,
+                    ends_at_end_time INTEGER NOT NULL DEFAULT 0,
+                    queued_at INTEGER NOT NULL
+                )
+            """)
+            # Queues written before jobs could be anchored to their end time
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(scrobble_jobs)")]
+            if 'ends_at_end_time' not in columns:
+                self.conn.execute(
+                    "ALTER TABLE scrobble_jobs ADD COLUMN ends_at_end_time INTEGER NOT NULL DEFAULT 0"
+                )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS scrobble_jobs_start ON scrobble_jobs(start_time)")
+            # Crash-safe replay: whatever was being sent when we died is pending again
+            self.conn.execute("UPDATE pending_scrobbles SET in_flight = 0 WHERE in_flight = 1")
+
+    def add(self, scrobbles, in_flight=False, job_ids=()):
+        """Write scrobbles to disk and return their spool ids
+
+        job_ids are queued jobs these scrobbles were planned from; they are
+        removed from the queue in the same transaction.
+        """
+        now = int(time.time())
+        ids = []
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM scrobble_jobs WHERE id = ?", [(i,) for i in job_ids])
+            for item in scrobbles:
+                cursor = self.conn.execute(
+                    "INSERT INTO pending_scrobbles (artist, track, album, timestamp, queued_at, in_flight) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (item['artist'], item['track'], item.get('album') or '',
+                     int(item['timestamp'].timestamp()), now, int(in_flight))
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim(self, limit):
+        """Mark up to limit of the oldest pending scrobbles in flight and return them
+
+        Returns a list of (spool_id, scrobble) pairs.
+        """
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, artist, track, album, timestamp FROM pending_scrobbles "
+                "WHERE in_flight = 0 ORDER BY timestamp, id LIMIT ?",
+                (limit,)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE pending_scrobbles SET in_flight = 1, attempts = attempts + 1 WHERE id = ?",
+                [(row[0],) for row in rows]
+            )
+
+        return [(row_id, {
+            'artist': artist,
+            'track': track,
+            'album': album,
+            'timestamp': datetime.fromtimestamp(timestamp)
+        }) for row_id, artist, track, album, timestamp in rows]
+
+    def find_pending(self, scrobbles, window):
+        """Return one flag per scrobble: True if the same track is already waiting within window seconds of it"""
+        if not scrobbles:
+            return []
+        timestamps = [int(scrobble['timestamp'].timestamp()) for scrobble in scrobbles]
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT artist, track, timestamp FROM pending_scrobbles WHERE timestamp > ? AND timestamp < ?",
+                (min(timestamps) - window, max(timestamps) + window)
+            ).fetchall()
+
+        pending = {}
+        for artist, track, timestamp in rows:
+            pending.setdefault((artist.strip().casefold(), track.strip().casefold()), []).append(timestamp)
+        return [any(abs(other - timestamp) < window
+                    for other in pending.get((scrobble['artist'].strip().casefold(),
+                                              scrobble['track'].strip().casefold()), ()))
+                for scrobble, timestamp in zip(scrobbles, timestamps)]
+
+    def remove(self, ids):
+        """Drop acknowledged scrobbles from the spool"""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM pending_scrobbles WHERE id = ?", [(i,) for i in ids])
+
+    def release(self, ids):
+        """Put unacknowledged scrobbles back in the queue for a later flush"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE pending_scrobbles SET in_flight = 0 WHERE id = ?", [(i,) for i in ids]
+            )
+
+    def add_job(self, title, tracks, start_time, end_time, avg_track_length=4, allow_duplicates=False,
+                ends_at_end_time=False):
+        """Queue a CD's selected tracks, listened to from about start_time to about end_time; returns the job id"""
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO scrobble_jobs (title, tracks, start_time, end_time, avg_track_length, "
+                "allow_duplicates, ends_at_end_time, queued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, json.dumps([dict(track) for track in tracks]), int(start_time.timestamp()),
+                 int(end_time.timestamp()), avg_track_length, int(allow_duplicates), int(ends_at_end_time),
+                 int(time.time()))
+            )
+        return cursor.lastrowid
+
+    def jobs(self):
+        """Every queued job, earliest start time first"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM scrobble_jobs ORDER BY start_time, id"
+            ).fetchall()
+        return [self.job_from_row(row) for row in rows]
+
+    def overlapping_jobs(self, start_time, end_time):
+        """Queued jobs whose listening time overlaps start_time..end_time"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM scrobble_jobs WHERE start_time < ? AND end_time > ? "
+                "ORDER BY start_time, id",
+                (int(end_time.timestamp()), int(start_time.timestamp()))
+            ).fetchall()
+        return [self.job_from_row(row) for row in rows]
+
+    def job_from_row(self, row):
+        job_id, title, tracks, start_time, end_time, avg_track_length, allow_duplicates, ends_at_end_time = row
+        return ScrobbleJob(job_id, title, json.loads(tracks), datetime.fromtimestamp(start_time),
+                           datetime.fromtimestamp(end_time), avg_track_length, bool(allow_duplicates),
+                           bool(ends_at_end_time))
+
+    def remove_jobs(self, job_ids):
+        """Take jobs out of the queue without scrobbling them"""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM scrobble_jobs WHERE id = ?", [(i,) for i in job_ids])
+
+    def job_count(self):
+        """Number of CDs waiting in the scrobble queue"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scrobble_jobs").fetchone()[0]
+
+    def count(self):
+        """Number of scrobbles waiting in the spool, including ones in flight"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pending_scrobbles").fetchone()[0]
+
+    def close(self):
+        """Close the spool database"""
+        with self.lock:
+            self.conn.close()
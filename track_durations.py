@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+
+class DurationCache:
+    """Persistent cache of track durations looked up with track.getInfo
+
+    Durations are in seconds and keyed by artist and track name, compared
+    case-insensitively. A track Last.fm has no duration for is cached as
+    None too, so it is not asked about again on every run. Entries expire
+    ttl seconds after they were fetched, and once there are more than
+    max_entries the least recently used ones are evicted.
+
+    The live entries are also held in memory, so a lookup reads nothing
+    from disk and writes back only the time its hits were used.
+    """
+    def __init__(self, cache_file="track_durations.db", ttl=30 * 24 * 60 * 60, max_entries=20000):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS track_durations (
+                    artist_key TEXT NOT NULL,
+                    track_key TEXT NOT NULL,
+                    duration INTEGER,
+                    fetched_at INTEGER NOT NULL,
+                    used_at INTEGER NOT NULL,
+                    PRIMARY KEY (artist_key, track_key)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("DELETE FROM track_durations WHERE fetched_at < ?", (int(time.time()) - ttl,))
+
+        # key -> [duration, fetched_at, used_at]
+        self.entries = {(artist_key, track_key): [duration, fetched_at, used_at]
+                        for artist_key, track_key, duration, fetched_at, used_at in self.conn.execute(
+                            "SELECT artist_key, track_key, duration, fetched_at, used_at FROM track_durations"
+                        )}
+
+    def key(self, artist, track):
+        return (artist.strip().casefold(), track.strip().casefold())
+
+    def lookup(self, keys):
+        """Map the keys that are cached and not expired to their duration (None if unknown)"""
+        now = int(time.time())
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] < now - self.ttl:
+                    del self.entries[key]
+                    continue
+                entry[2] = now
+                found[key] = entry[0]
+
+            # Record the use so eviction keeps what is still being played
+            if found:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE track_durations SET used_at = ? WHERE artist_key = ? AND track_key = ?",
+                        [(now,) + key for key in found]
+                    )
+        return found
+
+    def store(self, durations):
+        """Cache a dict of key -> duration in seconds (or None), then evict if over max_entries"""
+        now = int(time.time())
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO track_durations (artist_key, track_key, duration, fetched_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(artist_key, track_key, duration, now, now)
+                 for (artist_key, track_key), duration in durations.items()]
+            )
+            for key, duration in durations.items():
+                self.entries[key] = [duration, now, now]
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        excess = len(self.entries) - self.max_entries
+        if excess <= 0:
+            return
+        stale = sorted(self.entries, key=lambda key: self.entries[key][2])[:excess]
+        self.conn.executemany("DELETE FROM track_durations WHERE artist_key = ? AND track_key = ?", stale)
+        for key in stale:
+            del self.entries[key]
+
+    def count(self):
+        """Number of cached durations"""
+        with self.lock:
+            return len(self.entries)
+
+    def close(self):
+        """Close the cache database"""
+        with self.lock:
+            self.conn.close()